@@ -1,9 +1,69 @@
 
 from __future__ import annotations
 import backtrader as bt
+import numpy as np
+import pandas as pd
 
 DEFAULT_ANALYZERS = [
     (bt.analyzers.TradeAnalyzer, "ta", None),
     (bt.analyzers.SharpeRatio_A, "sharpe", {"riskfreerate": 0.0}),
     (bt.analyzers.DrawDown, "dd", None),
 ]
+
+
+def add_default_analyzers(cerebro: bt.Cerebro) -> None:
+    """Attach DEFAULT_ANALYZERS with direct calls (no tuple unpacking per run)."""
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="ta")
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio_A, _name="sharpe", riskfreerate=0.0)
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="dd")
+
+
+def compute_metrics(equity: np.ndarray, freq: int = 252) -> dict:
+    """
+    Sharpe and drawdown stats from an equity curve in a few NumPy passes.
+
+    Sharpe is the per-bar return mean / std scaled by sqrt(freq) (risk-free
+    rate 0); None if undefined. Drawdown follows Backtrader's DrawDown
+    analyzer conventions: max_drawdown in percent (positive), max_dd_len in
+    bars for the longest stretch spent below a previous peak.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.size < 2:
+        return {"sharpe": None, "max_drawdown": 0.0, "max_dd_len": 0}
+
+    rets = np.diff(equity) / equity[:-1]
+    std = rets.std()
+    sharpe = float(rets.mean() / std * np.sqrt(freq)) if std > 0 else None
+
+    peaks = np.maximum.accumulate(equity)
+    dd = (equity - peaks) / peaks
+
+    # Run lengths of dd < 0 from the edges of the padded boolean mask
+    under = np.concatenate(([False], dd < 0, [False]))
+    edges = np.flatnonzero(np.diff(under.astype(np.int8)))
+    runs = edges[1::2] - edges[::2]
+
+    return {
+        "sharpe": sharpe,
+        "max_drawdown": float(-dd.min() * 100.0),
+        "max_dd_len": int(runs.max()) if runs.size else 0,
+    }
+
+
+def trade_stats(trades) -> dict:
+    """
+    Win/loss counts and total net PnL from closed-trade records, in one pass.
+
+    trades is a DataFrame or list of dicts with a net_pnl column (as produced
+    by MaCrossStrategy and the engines). A trade counts as won when its net
+    PnL is >= 0, like Backtrader's TradeAnalyzer.
+    """
+    net = pd.DataFrame(trades).get("net_pnl", pd.Series(dtype=float)).to_numpy(dtype=float)
+    wins = int((net >= 0).sum())
+    return {
+        "total_trades": len(net),
+        "wins": wins,
+        "losses": len(net) - wins,
+        "win_rate": wins / len(net) * 100 if len(net) else None,
+        "total_profit": float(net.sum()),
+    }
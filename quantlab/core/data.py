@@ -1,11 +1,49 @@
 
 from __future__ import annotations
+from pathlib import Path
+import numpy as np
 import pandas as pd
-import yfinance as yf
 import backtrader as bt
+from quantlab.core.indicators import sma_cross
 
+CACHE_DIR = Path.home() / ".quantlab_cache"
+
+# Stored as float32: ~7 significant digits is ample for SMA/signal/Sharpe work
+# on prices below ~1e6, and halves the bytes every rolling pass streams.
+# Cash, PnL and the SMA running sums are still computed in float64 by the engines.
+PRICE_COLUMNS = ("open", "high", "low", "close", "adj_close")
+
+
+def _cache_path(symbol: str, start: str, end: str) -> Path:
+    return CACHE_DIR / f"{symbol}_{start}_{end}.parquet"
+
+
+def _compact_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuild df so every column is its own contiguous array, prices as float32.
+
+    Frames wrapping a row-major 2D array (pandas < 3 keeps it as a view) make
+    df[col].to_numpy() strided; this makes it a zero-copy contiguous read.
+    Volume and any other columns keep their dtype.
+    """
+    return pd.DataFrame(
+        {
+            c: np.ascontiguousarray(
+                df[c].to_numpy(dtype=np.float32) if c in PRICE_COLUMNS else df[c].to_numpy()
+            )
+            for c in df.columns
+        },
+        index=df.index,
+    )
+
+
+def download_ohlcv(symbol: str, start: str, end: str, use_cache: bool = True) -> pd.DataFrame:
+    path = _cache_path(symbol, start, end)
+    if use_cache and path.exists():
+        return _compact_columns(pd.read_parquet(path))
+
+    import yfinance as yf  # only needed on a cache miss; slow to import
 
-def download_ohlcv(symbol: str, start: str, end: str) -> pd.DataFrame:
     df = yf.download(symbol, start=start, end=end, progress=False)
     if getattr(df.index, "tz", None) is not None:
         df.index = df.index.tz_localize(None)
@@ -13,17 +51,107 @@ def download_ohlcv(symbol: str, start: str, end: str) -> pd.DataFrame:
         df.columns = df.columns.get_level_values(0)
     df.columns = [str(c).lower() for c in df.columns]
     df = df.rename(columns={"adj close": "adj_close"})
+    df = _compact_columns(df)
+
+    # Only cache successful downloads so a network failure is retried next run
+    if use_cache and not df.empty:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(path, engine="pyarrow", compression="zstd")
     return df
 
 
-def bt_feed_from_df(df: pd.DataFrame) -> bt.feeds.PandasData:
-    return bt.feeds.PandasData(
-        dataname=df,
-        datetime=None,
-        open="open",
-        high="high",
-        low="low",
-        close="close",
-        volume="volume",
-        openinterest=None,
+def _bt_date_nums(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Vectorized bt.date2num over a tz-naive (or UTC-converted) DatetimeIndex.
+
+    Daily bars sit on midnight, where date2num is exactly the proleptic
+    ordinal; intraday stamps fall back to date2num itself so the fractional
+    day is bit-identical to what PandasData would store.
+    """
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    ns = index.asi8
+    days, rem = np.divmod(ns, 86_400_000_000_000)
+    if not rem.any():
+        return (days + 719163).astype(np.float64)
+    return np.fromiter((bt.date2num(ts.to_pydatetime()) for ts in index),
+                       dtype=np.float64, count=len(index))
+
+
+class ArrayPandasData(bt.feeds.PandasData):
+    """
+    PandasData that converts the frame to NumPy once in start().
+
+    The stock _load does an iloc lookup per field and a date2num per bar;
+    here every mapped column and the datetime index are turned into arrays
+    up front and _load just copies the current row into the lines.
+    """
+
+    def start(self):
+        super().start()
+        df = self.p.dataname
+        self._rows = len(df)
+        self._fields = [
+            (getattr(self.lines, field), df.iloc[:, col].to_numpy(dtype=np.float64))
+            for field in self.getlinealiases()
+            if field != "datetime" and (col := self._colmapping[field]) is not None
+        ]
+        coldtime = self._colmapping["datetime"]
+        stamps = df.index if coldtime is None else pd.DatetimeIndex(df.iloc[:, coldtime])
+        self._dtnums = _bt_date_nums(stamps)
+
+    def _load(self):
+        self._idx += 1
+        i = self._idx
+        if i >= self._rows:
+            return False
+        for line, values in self._fields:
+            line[0] = values[i]
+        self.lines.datetime[0] = self._dtnums[i]
+        return True
+
+
+class SignalPandasData(ArrayPandasData):
+    """PandasData carrying a precomputed SMA and CrossOver-style signal line."""
+    lines = ("sma", "signal")
+    params = (
+        ("sma", "sma"),
+        ("signal", "signal"),
+        ("ma_period", None),  # period the sma/signal columns were built with
     )
+
+
+def bt_feed_from_df(df: pd.DataFrame, ma_period: int | None = None) -> ArrayPandasData:
+    """
+    Backtrader feed over df. The close column is attached as feed._np_close
+    so strategies can precompute signals without waiting for preload; with
+    ma_period the SMA/cross signal columns are precomputed as well.
+    """
+    close = df["close"].to_numpy()
+    if ma_period is not None:
+        cross, line = sma_cross(close, ma_period)
+        df = df.assign(sma=line, signal=cross).fillna({"signal": 0.0})
+        feed = SignalPandasData(
+            dataname=df,
+            datetime=None,
+            open="open",
+            high="high",
+            low="low",
+            close="close",
+            volume="volume",
+            openinterest=None,
+            ma_period=ma_period,
+        )
+    else:
+        feed = ArrayPandasData(
+            dataname=df,
+            datetime=None,
+            open="open",
+            high="high",
+            low="low",
+            close="close",
+            volume="volume",
+            openinterest=None,
+        )
+    feed._np_close = close
+    return feed
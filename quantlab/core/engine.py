@@ -1,6 +1,16 @@
 
 from __future__ import annotations
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
 import backtrader as bt
+import numpy as np
+import pandas as pd
+from quantlab.core.analyzers import (DEFAULT_ANALYZERS, add_default_analyzers, compute_metrics,
+                                     trade_stats)
+from quantlab.core.data import download_ohlcv
+from quantlab.core.indicators import sma_cross
+from quantlab.strategies.ma_cross_vec import cross_fills
 
 
 def run_backtest(strategy_cls,
@@ -9,19 +19,224 @@ def run_backtest(strategy_cls,
                  commission: float = 0.001,
                  sizer_stake: int = 100,
                  analyzers=None,
-                 strategy_kwargs=None):
+                 strategy_kwargs=None,
+                 minimal: bool | None = None):
     analyzers = analyzers or []
     strategy_kwargs = strategy_kwargs or {}
+    # Strategies that record their own trades/fills set MINIMAL = True to skip
+    # the standard broker/trades/buysell observers, which update every bar
+    if minimal is None:
+        minimal = getattr(strategy_cls, "MINIMAL", False)
 
-    cerebro = bt.Cerebro()
+    cerebro = bt.Cerebro(stdstats=not minimal)
     cerebro.adddata(data_feed)
     cerebro.addstrategy(strategy_cls, **strategy_kwargs)
     cerebro.broker.setcash(initial_cash)
     cerebro.broker.setcommission(commission=commission)
     cerebro.addsizer(bt.sizers.FixedSize, stake=sizer_stake)
 
-    for an, name, kwargs in analyzers:
-        cerebro.addanalyzer(an, _name=name, **(kwargs or {}))
+    if analyzers is DEFAULT_ANALYZERS:
+        add_default_analyzers(cerebro)
+    else:
+        for an, name, kwargs in analyzers:
+            cerebro.addanalyzer(an, _name=name, **(kwargs or {}))
 
     strat = cerebro.run()[0]
     return cerebro, strat
+
+
+def run_vectorized_ma_cross(df: pd.DataFrame,
+                            ma_period: int = 20,
+                            stake: int = 100,
+                            cash: float = 100_000.0,
+                            commission: float = 0.001) -> dict:
+    """
+    Vectorized equivalent of running MaCrossStrategy through run_backtest.
+
+    Mirrors the Backtrader defaults used there: crosses are detected on the
+    close vs SMA(ma_period) with CrossOver's "last non-zero difference" rule,
+    market orders fill at the next bar's open, commission is a fraction of
+    the traded value, and equity is marked to market on each close.
+    """
+    # Prices are stored as float32 by download_ohlcv; the SMA and fill prices
+    # are widened so signals, cash and PnL are all computed in float64.
+    open_ = df["open"].to_numpy(dtype=np.float64)
+    close = df["close"].to_numpy()
+    n = len(close)
+    cross, sma = sma_cross(close, ma_period)
+
+    # Entries on up-crosses, exits on the next down-cross; fills on the following bar
+    entry_i, exit_i = cross_fills(cross, lag=1)
+
+    # Position held at each close; +1 from the entry bar, 0 from the exit bar
+    events = np.zeros(n + 1)
+    events[entry_i] += 1
+    events[exit_i] -= 1
+    position = np.cumsum(events[:n]) * stake
+
+    # Cash flows on fill bars, then equity = cash + position value at close
+    entry_px = open_[entry_i]
+    exit_px = open_[exit_i]
+    flows = np.zeros(n)
+    flows[entry_i] -= entry_px * stake * (1.0 + commission)
+    flows[exit_i] += exit_px * stake * (1.0 - commission)
+    equity = cash + np.cumsum(flows) + position * close
+
+    trades, fills = _trade_records(df.index, open_, entry_i, exit_i, stake, commission)
+
+    return {
+        "final_value": float(equity[-1]) if n else float(cash),
+        "equity": equity,
+        "metrics": compute_metrics(equity),
+        "position": position,
+        "sma": sma,
+        "trades": trades,
+        "fills": fills,
+    }
+
+
+def run_fast_path(strategy_cls,
+                  df: pd.DataFrame,
+                  initial_cash: float = 100_000.0,
+                  commission: float = 0.001,
+                  sizer_stake: int = 100,
+                  strategy_kwargs=None) -> dict:
+    """
+    Run a strategy through the compiled bar loop in quantlab.core.fastloop.
+
+    The strategy class opts in with `supports_fast_path = True` and provides
+    `fast_signal(df, **strategy_kwargs)` returning a per-bar signal array
+    (> 0 enter long, < 0 exit). Returns the same dict as run_vectorized_ma_cross.
+    """
+    if not getattr(strategy_cls, "supports_fast_path", False):
+        raise ValueError(f"{strategy_cls.__name__} does not support the fast path")
+    from quantlab.core.fastloop import simulate  # pulls in Numba; only this engine needs it
+    strategy_kwargs = strategy_kwargs or {}
+
+    open_ = df["open"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
+    signal = np.asarray(strategy_cls.fast_signal(df, **strategy_kwargs), dtype=float)
+    equity, trades_idx, _ = simulate(
+        open_,
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        close,
+        signal,
+        float(sizer_stake),
+        float(commission),
+    )
+    equity = equity + initial_cash
+
+    entry_i = trades_idx[:, 0].astype(np.intp)
+    exit_i = trades_idx[:, 1][trades_idx[:, 1] >= 0].astype(np.intp)
+    events = np.zeros(len(close) + 1)
+    events[entry_i] += 1
+    events[exit_i] -= 1
+    position = np.cumsum(events[:-1]) * sizer_stake
+    trades, fills = _trade_records(df.index, open_, entry_i, exit_i, sizer_stake, commission)
+
+    return {
+        "final_value": float(equity[-1]) if len(equity) else float(initial_cash),
+        "equity": equity,
+        "metrics": compute_metrics(equity),
+        "position": position,
+        "signal": signal,
+        "trades": trades,
+        "fills": fills,
+    }
+
+
+# Per-worker price frame for run_sweep, loaded once by _init_sweep_worker
+_SWEEP_DF = None
+
+
+def _init_sweep_worker(symbol: str, start: str, end: str) -> None:
+    global _SWEEP_DF
+    _SWEEP_DF = download_ohlcv(symbol, start, end)
+
+
+def _sweep_task(params: dict) -> dict:
+    res = run_vectorized_ma_cross(_SWEEP_DF, **params)
+    stats = trade_stats(res["trades"])
+    cash = params["cash"]
+    return {
+        **params,
+        "final_value": res["final_value"],
+        "return_pct": (res["final_value"] / cash - 1.0) * 100.0,
+        "total_trades": stats["total_trades"],
+        "win_rate": stats["win_rate"],
+        **res["metrics"],
+    }
+
+
+def run_sweep(symbol: str,
+              start: str,
+              end: str,
+              param_grid: dict,
+              cash: float = 100_000.0,
+              max_workers: int | None = None) -> pd.DataFrame:
+    """
+    Run run_vectorized_ma_cross over every combination in param_grid.
+
+    param_grid maps run_vectorized_ma_cross keyword names (ma_period, stake,
+    commission) to lists of values. Combinations are spread over a process
+    pool; each worker loads the (Parquet-cached) data once via its
+    initializer. Returns one row per combination with its summary stats.
+    """
+    # Populate the cache up front so workers never hit the network
+    download_ohlcv(symbol, start, end)
+
+    keys = list(param_grid)
+    combos = [dict(zip(keys, values), cash=cash)
+              for values in itertools.product(*(param_grid[k] for k in keys))]
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(combos) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_sweep_worker,
+                             initargs=(symbol, start, end)) as pool:
+        rows = list(pool.map(_sweep_task, combos, chunksize=chunksize))
+    return pd.DataFrame(rows)
+
+
+def _trade_records(index, open_, entry_i, exit_i, stake, commission):
+    """Build the trades / fills dict lists (same columns as MaCrossStrategy)."""
+    entry_px = open_[entry_i]
+    exit_px = open_[exit_i]
+    entry_comm = entry_px * stake * commission
+    exit_comm = exit_px * stake * commission
+    closed = len(exit_i)
+    gross = (exit_px - entry_px[:closed]) * stake
+    comm = entry_comm[:closed] + exit_comm
+    return_pct = exit_px * (100.0 / entry_px[:closed]) - 100.0
+    trades = [
+        {
+            "entry_time": index[e].to_pydatetime(),
+            "exit_time": index[x].to_pydatetime(),
+            "size_peak": float(stake),
+            "avg_entry_cost": float(ep),
+            "exit_price": float(xp),
+            "return_pct": float(r),
+            "gross_pnl": float(g),
+            "net_pnl": float(g - c),
+            "commission": float(c),
+            "fills_count": 2,
+        }
+        for e, x, ep, xp, r, g, c in zip(entry_i, exit_i, entry_px, exit_px, return_pct,
+                                         gross, comm)
+    ]
+
+    fill_i = np.concatenate([entry_i, exit_i])
+    fill_side = np.concatenate([np.ones(len(entry_i)), -np.ones(closed)])
+    fill_comm = np.concatenate([entry_comm, exit_comm])
+    order = np.argsort(fill_i, kind="stable")
+    fills = [
+        {
+            "time": index[i].to_pydatetime(),
+            "side": "BUY" if s > 0 else "SELL",
+            "size": float(s * stake),
+            "price": float(open_[i]),
+            "commission": float(c),
+        }
+        for i, s, c in zip(fill_i[order], fill_side[order], fill_comm[order])
+    ]
+    return trades, fills
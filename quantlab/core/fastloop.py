@@ -0,0 +1,67 @@
+
+# -*- coding: utf-8 -*-
+"""
+Bar-by-bar simulation compiled with Numba, for strategies whose position
+logic is stateful and cannot be expressed as whole-array operations.
+
+Falls back to plain Python (same results, interpreter speed) when Numba is
+not installed.
+"""
+from __future__ import annotations
+import numpy as np
+from quantlab.utils._njit import njit
+
+
+@njit(cache=True)
+def simulate(open_, high, low, close, signal, stake, commission):
+    """
+    Long-only signal follower with Backtrader's default fill model.
+
+    A signal > 0 while flat (or < 0 while long) on bar i places a market order
+    that fills at open_[i + 1]; commission is a fraction of the traded value.
+    high/low are accepted so intrabar rules (e.g. stops) can be added here.
+
+    Returns:
+        equity: cash delta plus marked-to-market position at each close
+        trades_idx: (k, 2) int32 entry/exit bar indices; exit is -1 for a
+            position still open on the last bar
+        trades_pnl: (k,) net PnL per trade (0.0 for an open position)
+    """
+    n = close.shape[0]
+    equity = np.empty(n)
+    trades_idx = np.empty((n // 2 + 1, 2), dtype=np.int32)
+    trades_pnl = np.zeros(n // 2 + 1)
+
+    cash = 0.0
+    pos = 0.0
+    entry_px = 0.0
+    entry_comm = 0.0
+    pending = 0  # +1 buy / -1 sell to fill at this bar's open
+    k = 0
+    for i in range(n):
+        if pending == 1:
+            entry_px = open_[i]
+            entry_comm = entry_px * stake * commission
+            cash -= entry_px * stake + entry_comm
+            pos = stake
+            trades_idx[k, 0] = i
+            trades_idx[k, 1] = -1
+        elif pending == -1:
+            px = open_[i]
+            comm = px * stake * commission
+            cash += px * stake - comm
+            pos = 0.0
+            trades_idx[k, 1] = i
+            trades_pnl[k] = (px - entry_px) * stake - entry_comm - comm
+            k += 1
+        pending = 0
+
+        if pos == 0.0 and signal[i] > 0:
+            pending = 1
+        elif pos != 0.0 and signal[i] < 0:
+            pending = -1
+        equity[i] = cash + pos * close[i]
+
+    if pos != 0.0:
+        k += 1
+    return equity, trades_idx[:k], trades_pnl[:k]
@@ -0,0 +1,187 @@
+
+from __future__ import annotations
+import math
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+try:
+    import bottleneck as bn
+except ImportError:  # pragma: no cover - optional dependency
+    bn = None
+
+
+def sma(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    Simple moving average; NaN until a full window is available.
+
+    Always computed in float64: bottleneck's float32 kernel keeps its running
+    sum in float32, which drifts with series length and flips crosses
+    against the float64 compiled and Backtrader paths.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if period > len(close):
+        return np.full(len(close), np.nan)
+    if bn is not None:
+        # Single C pass with a running sum; same result as rolling().mean()
+        return bn.move_mean(close, window=period, min_count=period)
+    return pd.Series(close).rolling(period).mean().to_numpy()
+
+
+def crossover(close: np.ndarray, line: np.ndarray) -> np.ndarray:
+    """
+    Vectorized bt.ind.CrossOver(close, line): +1 on an up-cross, -1 on a
+    down-cross, 0 otherwise (NaN while line is warming up).
+
+    Like Backtrader, ties carry the last non-zero difference forward, so a
+    touch of the line is not a cross.
+    """
+    sign = np.sign(close - line)
+    sign[sign == 0] = np.nan
+    sign = pd.Series(sign).ffill().to_numpy()
+    return np.diff(sign, prepend=np.nan) / 2.0
+
+
+# Relative gap under which a running-sum SMA is too close to call: the
+# drift of a float64 running sum stays orders of magnitude below this, and
+# real gaps this small are rare enough to re-check one by one.
+TIE_RTOL = 1e-6
+
+
+def near_ties(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Bars where a and b are within TIE_RTOL of each other (False on NaN)."""
+    return np.abs(a - b) <= TIE_RTOL * np.abs(b)
+
+
+def fsum_sma(close: np.ndarray, period: int, idx: np.ndarray) -> np.ndarray:
+    """bt.ind.SimpleMovingAverage at bars idx: math.fsum of the window / period."""
+    close = np.asarray(close, dtype=np.float64)
+    return np.array([math.fsum(close[i - period + 1:i + 1]) / period for i in idx],
+                    dtype=np.float64)
+
+
+def sma_cross(close: np.ndarray,
+              period: int,
+              slow_period: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    crossover() of close vs SMA(period), or of SMA(period) vs SMA(slow_period),
+    decided exactly as Backtrader's SMA + CrossOver would.
+
+    bt's SMA is math.fsum(window) / period, so close == SMA is a tie there,
+    while a running sum can land an ulp either side of it and turn the tie
+    into a cross. Bars within TIE_RTOL get the fsum value instead. Returns
+    (cross, SMA(period)) with those bars' SMA values replaced.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    fast = sma(close, period)
+    if slow_period is None:
+        idx = np.flatnonzero(near_ties(close, fast))
+        fast[idx] = fsum_sma(close, period, idx)
+        return crossover(close, fast), fast
+    slow = sma(close, slow_period)
+    idx = np.flatnonzero(near_ties(fast, slow))
+    fast[idx] = fsum_sma(close, period, idx)
+    slow[idx] = fsum_sma(close, slow_period, idx)
+    return crossover(fast, slow), fast
+
+
+def rolling_apply(arr: np.ndarray, window: int, func) -> np.ndarray:
+    """
+    NumPy replacement for pd.Series.rolling(window).apply(func).
+
+    func must reduce along the last axis (e.g. np.std, or a function taking
+    `axis=-1`); it is called once on a (n - window + 1, window) view instead
+    of once per window with a freshly built Series. Output is NaN-padded to
+    len(arr). Custom indicators should use this, or rolling().apply(raw=True).
+    """
+    arr = np.asarray(arr, dtype=float)
+    out = np.full(arr.shape[0], np.nan)
+    if window <= arr.shape[0]:
+        windows = np.lib.stride_tricks.sliding_window_view(arr, window)
+        out[window - 1:] = func(windows, axis=-1)
+    return out
+
+
+def _fsum_add(partials: list, x: float) -> None:
+    """Add x to the exact non-overlapping partials of a sum (math.fsum's loop)."""
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+        x = hi
+    del partials[i:]
+    if x:
+        partials.append(x)
+
+
+def _fsum_value(partials: list) -> float:
+    """Correctly rounded value of the partials, as math.fsum returns it."""
+    n = len(partials)
+    if not n:
+        return 0.0
+    n -= 1
+    hi = partials[n]
+    lo = 0.0
+    while n > 0:
+        x = hi
+        n -= 1
+        y = partials[n]
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            break
+    # half-way case: round to even the way the exact sum would
+    if n > 0 and ((lo < 0.0 and partials[n - 1] < 0.0) or (lo > 0.0 and partials[n - 1] > 0.0)):
+        y = lo * 2.0
+        x = hi + y
+        if y == x - hi:
+            hi = x
+    return hi
+
+
+class IncrementalSMA(bt.Indicator):
+    """
+    Drop-in for bt.ind.SimpleMovingAverage using a running sum.
+
+    The stock SMA re-sums the whole window on every bar (O(N*period)); this
+    adds the new value and drops the oldest one per bar, in both runonce and
+    next modes. The sum is kept as math.fsum's exact partials rather than a
+    float, so every value is bit-identical to the stock SMA and a close that
+    ties it there ties it here too (a plain running sum drifts by an ulp).
+    """
+    lines = ("sma",)
+    params = (("period", 20),)
+    # Drawn like the stock SMA: on the price panel, as "SimpleMovingAverage (period)"
+    plotinfo = dict(subplot=False, plotname="SimpleMovingAverage")
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+        self._partials = []
+
+    def nextstart(self):
+        self._partials = []
+        for x in self.data.get(size=self.p.period):
+            _fsum_add(self._partials, x)
+        self.lines.sma[0] = _fsum_value(self._partials) / self.p.period
+
+    def next(self):
+        _fsum_add(self._partials, self.data[0])
+        _fsum_add(self._partials, -self.data[-self.p.period])
+        self.lines.sma[0] = _fsum_value(self._partials) / self.p.period
+
+    def once(self, start, end):
+        src = self.data.array
+        dst = self.lines.sma.array
+        period = self.p.period
+        partials = []
+        for x in src[start - period + 1:start]:
+            _fsum_add(partials, x)
+        for i in range(start, end):
+            _fsum_add(partials, src[i])
+            dst[i] = _fsum_value(partials) / period
+            _fsum_add(partials, -src[i - period + 1])
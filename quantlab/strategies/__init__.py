@@ -1,6 +1,8 @@
 
 from .ma_cross import MaCrossStrategy
 
+__all__ = ["MaCrossStrategy", "STRATEGY_REGISTRY", "get_strategy_class"]
+
 STRATEGY_REGISTRY = {
     "ma_cross": MaCrossStrategy,
 }
@@ -0,0 +1,111 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Ahead-of-time compiled MA cross kernel: same trades as _ma_cross_loop with
+a running-sum SMA (near-ties re-checked on the fsum SMA), but no Numba
+import or JIT warm-up. Built by setup.py.
+"""
+from libc.math cimport fabs
+
+import numpy as np
+
+from quantlab.core.indicators import TIE_RTOL
+
+cdef double _TIE_RTOL = TIE_RTOL
+
+
+cdef double _window_fsum(const double[::1] x, Py_ssize_t start, Py_ssize_t stop,
+                         double[::1] partials) noexcept nogil:
+    """math.fsum(x[start:stop]), same algorithm as CPython (see _ma_cross_loop)."""
+    cdef Py_ssize_t n = 0, i, j, k
+    cdef double v, y, hi, lo = 0.0
+    for k in range(start, stop):
+        v = x[k]
+        i = 0
+        for j in range(n):
+            y = partials[j]
+            if fabs(v) < fabs(y):
+                v, y = y, v
+            hi = v + y
+            lo = y - (hi - v)
+            if lo != 0.0:
+                partials[i] = lo
+                i += 1
+            v = hi
+        n = i
+        if v != 0.0:
+            partials[n] = v
+            n += 1
+    hi = 0.0
+    if n > 0:
+        n -= 1
+        hi = partials[n]
+        lo = 0.0
+        while n > 0:
+            v = hi
+            n -= 1
+            y = partials[n]
+            hi = v + y
+            lo = y - (hi - v)
+            if lo != 0.0:
+                break
+        if n > 0 and ((lo < 0.0 and partials[n - 1] < 0.0)
+                      or (lo > 0.0 and partials[n - 1] > 0.0)):
+            y = lo * 2.0
+            v = hi + y
+            if y == v - hi:
+                hi = v
+    return hi
+
+
+def run_ma_cross(const double[::1] close, Py_ssize_t period, double commission):
+    """Closed trades of the close/SMA(period) cross rule as a (k, 6) array."""
+    cdef Py_ssize_t n = close.shape[0]
+    out_arr = np.empty((n // 2 + 1, 6))
+    cdef double[:, ::1] out = out_arr
+    cdef double[::1] partials = np.empty(max(period, 1))
+    cdef Py_ssize_t i, k = 0, entry_i = 0
+    cdef double total = 0.0, ma, diff, px, entry_px = 0.0, gross
+    cdef int side = 0, s          # sign of the last non-zero close - sma
+    cdef bint in_pos = False
+
+    if period <= 0:
+        return out_arr[:0]
+    with nogil:
+        for i in range(n):
+            px = close[i]
+            if i < period:
+                total += px
+            else:
+                total += px - close[i - period]
+            if i < period - 1:
+                continue  # SMA still warming up
+            ma = total / period
+            diff = px - ma
+            if fabs(diff) <= _TIE_RTOL * fabs(ma):
+                # too close to call on the running sum: use bt's fsum SMA
+                diff = px - _window_fsum(close, i - period + 1, i + 1, partials) / period
+            if diff > 0:
+                s = 1
+            elif diff < 0:
+                s = -1
+            else:
+                continue  # tie (or NaN): keep the previous side
+            if side == 0 or s == side:
+                side = s
+                continue
+            side = s
+            if not in_pos and s > 0:
+                in_pos = True
+                entry_px = px
+                entry_i = i
+            elif in_pos and s < 0:
+                gross = px - entry_px
+                out[k, 0] = entry_i
+                out[k, 1] = i
+                out[k, 2] = entry_px
+                out[k, 3] = px
+                out[k, 4] = gross
+                out[k, 5] = gross - commission * (entry_px + px)
+                k += 1
+                in_pos = False
+    return out_arr[:k]
@@ -0,0 +1,215 @@
+
+"""
+Compiled bar loop for the price/SMA cross rule, for parameter sweeps that
+call it many times. Same trades as ma_cross_vec.run_ma_cross (fills at the
+signal bar's close); see TRADE_COLUMNS there for the output layout.
+
+The kernels release the GIL, so they can also be driven from a thread pool.
+"""
+from __future__ import annotations
+import numpy as np
+from quantlab.core.indicators import TIE_RTOL
+from quantlab.utils._njit import njit, prange
+
+
+@njit(cache=True, nogil=True)
+def _window_fsum(x, start, stop, partials):
+    """
+    math.fsum(x[start:stop]): CPython's exactly rounded sum (Shewchuk
+    partials plus its half-way rounding fix). partials is scratch space
+    of at least stop - start doubles.
+    """
+    n = 0
+    for k in range(start, stop):
+        v = x[k]
+        i = 0
+        for j in range(n):
+            y = partials[j]
+            if abs(v) < abs(y):
+                v, y = y, v
+            hi = v + y
+            lo = y - (hi - v)
+            if lo != 0.0:
+                partials[i] = lo
+                i += 1
+            v = hi
+        n = i
+        if v != 0.0:
+            partials[n] = v
+            n += 1
+    hi = 0.0
+    if n > 0:
+        n -= 1
+        hi = partials[n]
+        lo = 0.0
+        while n > 0:
+            v = hi
+            n -= 1
+            y = partials[n]
+            hi = v + y
+            lo = y - (hi - v)
+            if lo != 0.0:
+                break
+        if n > 0 and ((lo < 0.0 and partials[n - 1] < 0.0)
+                      or (lo > 0.0 and partials[n - 1] > 0.0)):
+            y = lo * 2.0
+            v = hi + y
+            if y == v - hi:
+                hi = v
+    return hi
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean(close, period):
+    """Running-sum SMA like bottleneck.move_mean; NaN until a full window."""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    for i in range(n):
+        if i < period:
+            total += close[i]
+        else:
+            total += close[i] - close[i - period]
+        if i >= period - 1:
+            out[i] = total / period
+    return out
+
+
+# A branchless variant (close/sma side as one byte per bar, then an XOR scan
+# of eight bars per uint64 word) measured no faster on 5M bars: ties carry
+# the previous side, so building the side bytes is itself a sequential pass
+# costing what the word-at-a-time scan saves. Keep the plain scalar loop.
+@njit(cache=True, nogil=True)
+def _ma_cross_loop(close, sma, period, commission):
+    """
+    Closed long trades of the close/sma cross rule as a (k, 6) float array.
+
+    sma is the running SMA(period) of close. Follows SMA + bt.ind.CrossOver:
+    a bar where close == sma, or sma is still NaN, keeps the previous side,
+    so only a change of side counts as a cross; bars within TIE_RTOL of the
+    SMA are decided on Backtrader's fsum value of the window instead.
+    commission is a fraction of each side's traded value (one share per trade).
+    """
+    n = close.shape[0]
+    trades = np.empty((n // 2 + 1, 6))
+    partials = np.empty(period)
+    k = 0
+    side = 0          # sign of the last non-zero close - sma
+    pos = 0
+    entry_px = 0.0
+    entry_i = 0
+    for i in range(n):
+        ma = sma[i]
+        diff = close[i] - ma
+        if abs(diff) <= TIE_RTOL * abs(ma):
+            diff = close[i] - _window_fsum(close, i - period + 1, i + 1, partials) / period
+        if diff > 0:
+            s = 1
+        elif diff < 0:
+            s = -1
+        else:  # tie or NaN warm-up
+            continue
+        crossed = side != 0 and s != side
+        side = s
+        if not crossed:
+            continue
+        px = float(close[i])
+        if pos == 0 and s > 0:
+            pos = 1
+            entry_px = px
+            entry_i = i
+        elif pos == 1 and s < 0:
+            gross = px - entry_px
+            trades[k, 0] = entry_i
+            trades[k, 1] = i
+            trades[k, 2] = entry_px
+            trades[k, 3] = px
+            trades[k, 4] = gross
+            trades[k, 5] = gross - commission * (entry_px + px)
+            k += 1
+            pos = 0
+    return trades[:k]
+
+
+@njit(parallel=True, cache=True)
+def run_grid(close, periods, commission=0.001):
+    """Total net PnL per share of the cross rule for each SMA period, in parallel."""
+    out = np.empty(periods.shape[0])
+    for k in prange(periods.shape[0]):
+        trades = _ma_cross_loop(close, _rolling_mean(close, periods[k]), periods[k], commission)
+        out[k] = trades[:, 5].sum()
+    return out
+
+
+# Kernels specialized by _make_loop, keyed by SMA period
+_COMPILED: dict = {}
+
+
+def _make_loop(period: int):
+    """
+    Fused SMA + cross kernel with period baked in as a compile-time constant.
+
+    Same trades as _ma_cross_loop(close, _rolling_mean(close, period), period, ...),
+    but the running sum is kept in registers, so no SMA array is allocated,
+    and the window length and divisor are literals for LLVM.
+    """
+    period = int(period)
+
+    @njit(cache=True, nogil=True)
+    def loop(close, commission):
+        n = close.shape[0]
+        trades = np.empty((n // 2 + 1, 6))
+        partials = np.empty(period)
+        k = 0
+        side = 0
+        pos = 0
+        entry_px = 0.0
+        entry_i = 0
+        total = 0.0
+        for i in range(n):
+            px = float(close[i])
+            if i < period:
+                total += px
+            else:
+                total += px - close[i - period]
+            if i < period - 1:
+                continue
+            ma = total / period
+            diff = px - ma
+            if abs(diff) <= TIE_RTOL * abs(ma):
+                diff = px - _window_fsum(close, i - period + 1, i + 1, partials) / period
+            if diff > 0:
+                s = 1
+            elif diff < 0:
+                s = -1
+            else:
+                continue
+            crossed = side != 0 and s != side
+            side = s
+            if not crossed:
+                continue
+            if pos == 0 and s > 0:
+                pos = 1
+                entry_px = px
+                entry_i = i
+            elif pos == 1 and s < 0:
+                gross = px - entry_px
+                trades[k, 0] = entry_i
+                trades[k, 1] = i
+                trades[k, 2] = entry_px
+                trades[k, 3] = px
+                trades[k, 4] = gross
+                trades[k, 5] = gross - commission * (entry_px + px)
+                k += 1
+                pos = 0
+        return trades[:k]
+
+    return loop
+
+
+def specialized_loop(period: int):
+    """The _make_loop kernel for period, compiled on first use and reused."""
+    loop = _COMPILED.get(period)
+    if loop is None:
+        loop = _COMPILED[period] = _make_loop(period)
+    return loop
@@ -3,85 +3,231 @@
 """
 MaCrossStrategy: Price-SMA crossover strategy using Backtrader.
 """
+import sys
+from array import array
+from collections import deque
+
 import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from quantlab.core.indicators import IncrementalSMA, sma_cross
+
+# Backtrader date numbers count days from 0001-01-01 (ordinal 1); this is
+# the number for 1970-01-01, so (num - epoch) is days since the Unix epoch.
+_BT_UNIX_EPOCH = 719163.0
+
+
+def _num2datetime64(nums: np.ndarray) -> np.ndarray:
+    """Vectorized bt.num2date for tz-naive feeds (same hour/min/sec steps)."""
+    days = np.floor(nums)
+    hour, rem = np.divmod((nums - days) * 24.0, 1.0)
+    minute, rem = np.divmod(rem * 60.0, 1.0)
+    second, rem = np.divmod(rem * 60.0, 1.0)
+    micro = np.trunc(rem * 1e6)
+    # Same rounding-error compensation as num2date at both ends of a second
+    micro[micro < 10] = 0
+    micro[micro > 999990] = 1_000_000
+    us = (days - _BT_UNIX_EPOCH) * 86_400_000_000 + (
+        (hour * 3600 + minute * 60 + second) * 1_000_000 + micro
+    )
+    return us.astype("i8").astype("datetime64[us]").astype("datetime64[ns]")
+
+
+def _bars_match_frame(data, rows: int) -> bool:
+    """
+    True when the feed's bars are exactly the rows of its source frame.
+
+    A preloaded feed can be checked by length; otherwise only a feed with no
+    filters (resampledata/replaydata add one) and no date bounds qualifies.
+    """
+    if data._filters:
+        return False
+    if data.buflen():
+        return data.buflen() == rows
+    return data.p.fromdate is None and data.p.todate is None
 
 
 class MaCrossStrategy(bt.Strategy):
+    # Can be run by quantlab.core.engine.run_fast_path via fast_signal()
+    supports_fast_path = True
+    # Trades and fills are captured in notify_*; run_backtest drops the observers
+    MINIMAL = True
+
     params = (
+        ("mode", "single"),      # "single": close vs SMA(ma_period); "dual": fast vs slow SMA
         ("ma_period", 20),
+        ("fast_period", 20),
+        ("slow_period", 50),
+        ("vectorized_sma", True),  # False: always use Backtrader indicator lines
         ("export_fills", True),  # set True to export per-fill details
+        ("track_vwap", True),    # maintain the position VWAP (avg_entry_cost)
     )
 
     def __init__(self):
         # --- Indicators ---
-        self.sma = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.p.ma_period
-        )
-        self.crossover = bt.ind.CrossOver(self.data.close, self.sma)
+        # Feeds built with bt_feed_from_df(df, ma_period) carry the cross signal
+        # precomputed. Otherwise, when the whole close series is known up front
+        # (bt_feed_from_df attaches it as _np_close, or the feed is preloaded)
+        # the signal is computed here in one NumPy pass and next() reads
+        # self._cross by bar number. Live feeds, or vectorized_sma=False, use
+        # Backtrader indicator lines.
+        p = self.p
+        if p.mode not in ("single", "dual"):
+            raise ValueError(f"Unknown mode: {p.mode!r} (expected 'single' or 'dual')")
+        self._cross = None
+        # Columns computed over the frame only line up with the bars when
+        # no fromdate/todate or filter (e.g. resampledata) changed the rows
+        close = getattr(self.data, "_np_close", None)
+        aligned = close is not None and _bars_match_frame(self.data, len(close))
+        if not aligned:
+            close = np.asarray(self.data.close.array) if self.data.buflen() else None
+        if not p.vectorized_sma:
+            self._add_indicators()
+        elif (p.mode == "single" and aligned
+              and getattr(self.data.p, "ma_period", None) == p.ma_period):
+            self.crossover = self.data.signal
+        elif close is not None:
+            self._cross = self._cross_signal(close, p.mode, p.ma_period,
+                                             p.fast_period, p.slow_period)
+        else:
+            self._add_indicators()
 
         # --- Per-position ledger (for scaling in/out) ---
         self._pos_size = 0.0           # current total size (>0 for long)
         self._avg_cost = 0.0           # VWAP of the open position
-        self._realized_pnl = 0.0       # realized PnL from partial exits (pre-commission)
-        self._comm_total = 0.0         # accumulated commissions for this position
         self._first_entry_time = None  # timestamp of the first entry of this position
-        self._fills = []               # list of all fills for this position
+        self._fill_count = 0           # number of fills in this position
         self._size_peak = 0.0          # max size reached during this position
 
-        # --- Closed-trade summaries ---
-        self.trades = []               # per-trade summary (one row per complete round trip)
-        self.fills_log = []            # optional: all fills across all trades
+        # --- Closed-trade summaries and fills log, stored column-wise ---
+        # Typed arrays: unboxed appends, memory proportional to the number of
+        # fills/trades rather than to the length of the feed. Fill sizes and
+        # prices are float32 like the price columns in quantlab.core.data.
+        # Everything else stays float64: date numbers (float32 would only
+        # resolve them to ~1/16 day), the VWAP cost that exit_price/return_pct
+        # are derived from, and PnL/commissions, whose float32 rounding would
+        # move the exported cents away from the other engines'.
+        self._f_time = array("d")     # Backtrader date numbers
+        self._f_side = array("B")     # 1 = BUY, 0 = SELL
+        self._f_size = array("f")
+        self._f_price = array("f")
+        self._f_comm = array("d")
+
+        self._t_entry = array("d")    # Backtrader date numbers,
+        self._t_exit = array("d")     # converted in the trades property
+        self._t_size_peak = array("f")
+        self._t_avg_cost = array("d")
+        self._t_gross = array("d")
+        self._t_net = array("d")
+        self._t_comm = array("d")
+        self._t_fills = array("I")
+
+        # DataFrames over the buffers, built on first access (see the properties)
+        self._trades_df = None
+        self._fills_df = None
+
+        # log() lines as (date number, text); formatted and written once in stop()
+        self._log_buf = deque(maxlen=10_000)
+
+    def log(self, txt):
+        """Buffer a message stamped with the current bar (printed in stop())."""
+        self._log_buf.append((self.datas[0].datetime[0], txt))
+
+    def stop(self):
+        if self._log_buf:
+            sys.stdout.writelines(f"[{bt.num2date(dt):%Y-%m-%d %H:%M:%S}] {txt}\n"
+                                  for dt, txt in self._log_buf)
+            self._log_buf.clear()
+
+    def _add_indicators(self):
+        """Wire the cross signal through Backtrader lines (running-sum SMA, CrossOver)."""
+        p = self.p
+        if p.mode == "single":
+            self.sma = IncrementalSMA(self.data.close, period=p.ma_period)
+            self.crossover = bt.ind.CrossOver(self.data.close, self.sma)
+        else:
+            self.fast_sma = IncrementalSMA(self.data.close, period=p.fast_period)
+            self.slow_sma = IncrementalSMA(self.data.close, period=p.slow_period)
+            self.crossover = bt.ind.CrossOver(self.fast_sma, self.slow_sma)
+
+    @staticmethod
+    def _cross_signal(close, mode, ma_period, fast_period, slow_period):
+        """CrossOver values of close vs SMA ("single") or fast vs slow SMA ("dual")."""
+        if mode == "dual":
+            return sma_cross(close, fast_period, slow_period)[0]
+        return sma_cross(close, ma_period)[0]
+
+    @classmethod
+    def fast_signal(cls, df, mode="single", ma_period=20, fast_period=20, slow_period=50, **_):
+        """Per-bar CrossOver values for the compiled fast path."""
+        return cls._cross_signal(df["close"].to_numpy(), mode, ma_period,
+                                 fast_period, slow_period)
+
+    @classmethod
+    def run(cls, df, period=20, commission=0.0):
+        """
+        Closed trades of the single-SMA rule on df without Cerebro, via the
+        compiled loop.
+
+        Fills at the signal bar's close, one share per trade; returns the
+        (k, 6) array described by ma_cross_vec.TRADE_COLUMNS. Uses the first
+        kernel available: the Rust quantlab_rs extension, the Cython
+        _ma_cross_cy module (python setup.py build_ext --inplace), else a
+        Numba loop specialized for this period (compiled once per period).
+        """
+        close = np.ascontiguousarray(df["close"].to_numpy(dtype=np.float64))
+        try:
+            from quantlab_rs import run_ma_cross
+        except ImportError:
+            try:
+                from quantlab.strategies._ma_cross_cy import run_ma_cross
+            except ImportError:
+                from quantlab.strategies._ma_cross_loop import specialized_loop  # imports Numba
+                return specialized_loop(int(period))(close, float(commission))
+        return run_ma_cross(close, int(period), float(commission))
 
     def next(self):
         # Simple SMA cross logic
-        if not self.position and self.crossover[0] > 0:
+        cross = self.crossover[0] if self._cross is None else self._cross[len(self) - 1]
+        if not self.position and cross > 0:
             self.buy()
-        elif self.position and self.crossover[0] < 0:
+        elif self.position and cross < 0:
             self.sell()
 
     def notify_order(self, order):
         """Record each fill to support scaling and peak size."""
         if order.status != order.Completed:
+            if order.status in (order.Canceled, order.Margin, order.Rejected):
+                self.log(f"{'BUY' if order.isbuy() else 'SELL'} order {order.getstatusname()}")
             return
 
-        dt = self.datas[0].datetime.datetime(0)
+        dt = self.datas[0].datetime[0]        # raw date number; converted on export
         fill_size = order.executed.size       # buy: +, sell: -
         fill_price = order.executed.price
         fill_comm = order.executed.comm or 0.0
+        is_buy = order.isbuy()
 
         # Global fills log (across all trades), useful for exporting
         if self.p.export_fills:
-            self.fills_log.append(
-                {
-                    "time": dt,
-                    "side": "BUY" if order.isbuy() else "SELL",
-                    "size": float(fill_size),
-                    "price": float(fill_price),
-                    "commission": float(fill_comm),
-                }
-            )
+            self._f_time.append(dt)
+            self._f_side.append(is_buy)
+            self._f_size.append(fill_size)
+            self._f_price.append(fill_price)
+            self._f_comm.append(fill_comm)
 
-        # Commission accumulate for current position
-        self._comm_total += fill_comm
+        self._fill_count += 1
 
-        if order.isbuy():
+        if is_buy:
             # If entering from flat, initialize per-position ledger
             if self._pos_size == 0:
                 self._first_entry_time = dt
-                self._realized_pnl = 0.0
-                self._comm_total = fill_comm
-                self._fills = []
+                self._fill_count = 1
                 self._size_peak = 0.0
 
-            # Track this fill inside current position scope
-            self._fills.append(
-                {"time": dt, "side": "BUY", "size": float(fill_size),
-                 "price": float(fill_price), "commission": float(fill_comm)}
-            )
-
             # Update VWAP average cost
             new_size = self._pos_size + abs(fill_size)
-            if new_size > 0:
+            if self.p.track_vwap and new_size > 0:
                 self._avg_cost = (
                     (self._avg_cost * self._pos_size) + (fill_price * abs(fill_size))
                 ) / new_size
@@ -96,16 +242,6 @@ class MaCrossStrategy(bt.Strategy):
             # Cap to current size for safety
             sell_qty = min(sell_qty, self._pos_size)
 
-            # Realize PnL for the sold portion (pre-commission)
-            realized = (fill_price - self._avg_cost) * sell_qty
-            self._realized_pnl += realized
-
-            # Track this fill
-            self._fills.append(
-                {"time": dt, "side": "SELL", "size": float(-sell_qty),  # negative for clarity
-                 "price": float(fill_price), "commission": float(fill_comm)}
-            )
-
             # Reduce position size
             self._pos_size -= sell_qty
             # avg cost unchanged while position remains > 0
@@ -118,30 +254,68 @@ class MaCrossStrategy(bt.Strategy):
         dt_open = (
             self._first_entry_time
             if self._first_entry_time is not None
-            else bt.num2date(trade.dtopen).replace(tzinfo=None)
+            else trade.dtopen
         )
-        dt_close = bt.num2date(trade.dtclose).replace(tzinfo=None)
+        dt_close = trade.dtclose
 
         net_pnl = trade.pnlcomm if trade.pnlcomm is not None else trade.pnl
 
-        self.trades.append(
-            {
-                "entry_time": dt_open,
-                "exit_time": dt_close,
-                "size_peak": float(self._size_peak),         # <-- now filled
-                "avg_entry_cost": float(self._avg_cost),
-                "gross_pnl": float(trade.pnl),
-                "net_pnl": float(net_pnl),
-                "commission": float(trade.commission),
-                "fills_count": int(len(self._fills)),
-            }
-        )
+        self._t_entry.append(dt_open)
+        self._t_exit.append(dt_close)
+        self._t_size_peak.append(self._size_peak)
+        # Without the VWAP ledger, Backtrader's own average entry price is used
+        self._t_avg_cost.append(self._avg_cost if self.p.track_vwap else trade.price)
+        self._t_gross.append(trade.pnl)
+        self._t_net.append(net_pnl)
+        self._t_comm.append(trade.commission)
+        self._t_fills.append(self._fill_count)
 
         # Reset per-position ledger
         self._pos_size = 0.0
         self._avg_cost = 0.0
-        self._realized_pnl = 0.0
-        self._comm_total = 0.0
         self._first_entry_time = None
-        self._fills = []
+        self._fill_count = 0
         self._size_peak = 0.0
+
+    @property
+    def trades(self):
+        """Per-trade summary, one row per complete round trip."""
+        if self._trades_df is None or len(self._trades_df) != len(self._t_entry):
+            size_peak = np.array(self._t_size_peak)
+            avg_cost = np.array(self._t_avg_cost)
+            gross = np.array(self._t_gross)
+            # Average exit price recovered from gross PnL over the traded size
+            exit_price = avg_cost + gross / np.where(size_peak != 0, size_peak, np.nan)
+            # One reciprocal per trade, then a multiply-subtract over the column
+            with np.errstate(divide="ignore"):
+                return_pct = exit_price * (100.0 / avg_cost) - 100.0
+            self._trades_df = pd.DataFrame(
+                {
+                    "entry_time": _num2datetime64(np.array(self._t_entry)),
+                    "exit_time": _num2datetime64(np.array(self._t_exit)),
+                    "size_peak": size_peak,
+                    "avg_entry_cost": avg_cost,
+                    "exit_price": exit_price,
+                    "return_pct": return_pct,
+                    "gross_pnl": gross,
+                    "net_pnl": np.array(self._t_net),
+                    "commission": np.array(self._t_comm),
+                    "fills_count": np.array(self._t_fills),
+                }
+            )
+        return self._trades_df
+
+    @property
+    def fills_log(self):
+        """All fills across all trades (empty unless export_fills)."""
+        if self._fills_df is None or len(self._fills_df) != len(self._f_time):
+            self._fills_df = pd.DataFrame(
+                {
+                    "time": _num2datetime64(np.array(self._f_time)),
+                    "side": np.where(np.array(self._f_side, dtype=bool), "BUY", "SELL"),
+                    "size": np.array(self._f_size),
+                    "price": np.array(self._f_price),
+                    "commission": np.array(self._f_comm),
+                }
+            )
+        return self._fills_df
@@ -0,0 +1,62 @@
+
+"""
+Array-only version of MaCrossStrategy: the whole backtest in a few NumPy passes.
+
+The Backtrader class in ma_cross.py stays the reference implementation; the
+vectorized engine and the parity tests check these functions against it.
+"""
+from __future__ import annotations
+import numpy as np
+from quantlab.core.indicators import sma_cross
+
+# Column layout of the trades array returned by run_ma_cross
+TRADE_COLUMNS = ("entry_i", "exit_i", "entry_px", "exit_px", "gross", "net")
+
+
+def cross_fills(cross: np.ndarray, lag: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Entry / exit bar indices for a long-only cross rule.
+
+    cross is a crossover() array (> 0 up-cross, < 0 down-cross). Orders fill
+    `lag` bars after the signal (1 = next bar, as with Backtrader market
+    orders); fills that would land past the last bar are dropped. Each entry
+    is paired with the first down-cross after it via searchsorted, so
+    exit_i is one shorter than entry_i when the last position is still open.
+    """
+    n = len(cross)
+    ups = np.flatnonzero(cross > 0) + lag
+    downs = np.flatnonzero(cross < 0) + lag
+    entry_i = ups[ups < n]
+    # Crosses alternate, so every entry but possibly the last has its own exit
+    j = np.searchsorted(downs, entry_i, side="right")
+    exit_i = downs[j[j < len(downs)]]
+    return entry_i, exit_i[exit_i < n]
+
+
+def run_ma_cross(close: np.ndarray,
+                 period: int,
+                 open_: np.ndarray | None = None,
+                 stake: float = 1.0,
+                 commission: float = 0.0) -> np.ndarray:
+    """
+    Closed trades of the price/SMA(period) cross rule as a (k, 6) float array.
+
+    Columns are TRADE_COLUMNS. With open_ the trades fill at the next bar's
+    open like MaCrossStrategy under Backtrader; without it they fill at the
+    signal bar's close. commission is a fraction of each side's traded value.
+    """
+    close = np.asarray(close)
+    cross, _ = sma_cross(close, period)
+    if open_ is None:
+        px = close.astype(np.float64)
+        entry_i, exit_i = cross_fills(cross, lag=0)
+    else:
+        px = np.asarray(open_, dtype=np.float64)
+        entry_i, exit_i = cross_fills(cross, lag=1)
+
+    entry_i = entry_i[:len(exit_i)]
+    entry_px = px[entry_i]
+    exit_px = px[exit_i]
+    gross = (exit_px - entry_px) * stake
+    net = gross - commission * (entry_px + exit_px) * stake
+    return np.column_stack([entry_i, exit_i, entry_px, exit_px, gross, net]).astype(np.float64)
@@ -0,0 +1,16 @@
+
+"""
+Numba's njit/prange, or stand-ins that run the same code as plain Python
+(identical results, interpreter speed) when Numba is not installed.
+"""
+from __future__ import annotations
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - optional dependency
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -1,15 +1,184 @@
 
 from __future__ import annotations
+import threading
 from pathlib import Path
-import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+# Charts are drawn with at most this many bars; longer series are resampled
+MAX_PLOT_POINTS = 2000
+
+# pyplot keeps global figure state; guard it so charts can be drawn from threads
+_PYPLOT_LOCK = threading.Lock()
+
+_OHLCV_AGG = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+    "sma": "last",
+    "buy": "last",
+    "sell": "last",
+}
 
 
 def ensure_dir(path: str):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
+def _format_datetimes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Datetime columns as fixed strings, like DataFrame.to_csv writes them.
+
+    Dates only when every stamp is at midnight, else to the second. The
+    engines hand over datetimes at different units (ns from the Backtrader
+    strategy, us from the dict records), so formatting here keeps the CSVs
+    byte-identical across engines.
+    """
+    out = None
+    for col in df.columns:
+        values = df[col]
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            continue
+        daily = (values.dropna() == values.dropna().dt.normalize()).all()
+        out = df.copy() if out is None else out
+        out[col] = values.dt.strftime("%Y-%m-%d" if daily else "%Y-%m-%d %H:%M:%S")
+    return df if out is None else out
+
+
+def write_csv(df: pd.DataFrame, path) -> None:
+    """
+    Write df without its index via pyarrow's C++ CSV writer, else DataFrame.to_csv.
+
+    Headers and values are unquoted and datetimes formatted as to_csv would,
+    but pyarrow writes whole-number floats without the ".0" (100, not 100.0).
+    """
+    df = _format_datetimes(df)
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        df.to_csv(path, index=False)
+        return
+    # A value that needs quoting makes pyarrow raise; quoting_header is only
+    # available in newer pyarrow releases than the requirements.txt floor
+    try:
+        opts = pa_csv.WriteOptions(quoting_style="none", quoting_header="none")
+    except TypeError:
+        df.to_csv(path, index=False)
+        return
+    try:
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), str(path), opts)
+    except pa.ArrowInvalid:
+        df.to_csv(path, index=False)
+
+
 def save_cerebro_plot(cerebro, out_png: str):
+    import matplotlib.pyplot as plt
+
     figs = cerebro.plot(style="candle", volume=True, iplot=False)
     fig0 = figs[0][0] if isinstance(figs[0], (list, tuple)) else figs[0]
     fig0.savefig(out_png, dpi=300, bbox_inches="tight")
     plt.close(fig0)
+
+
+def downsample_ohlcv(df: pd.DataFrame, max_points: int = MAX_PLOT_POINTS) -> pd.DataFrame:
+    """
+    Resample a DatetimeIndex OHLCV frame to roughly max_points bars.
+
+    The bin width is the full time span divided by max_points; empty bins
+    (weekends, overnight gaps) are dropped, so the result may be shorter.
+    """
+    if len(df) <= max_points:
+        return df
+    rule = (df.index[-1] - df.index[0]) / max_points
+    agg = {c: how for c, how in _OHLCV_AGG.items() if c in df.columns}
+    return df.resample(rule).agg(agg).dropna(subset=["close"])
+
+
+def _plot_frame(df, fills, sma, max_points):
+    """OHLCV plus sma/buy/sell marker columns, downsampled for plotting."""
+    frame = df[[c for c in ("open", "high", "low", "close", "volume") if c in df.columns]]
+    frame = frame.assign(sma=np.nan if sma is None else np.asarray(sma, dtype=float),
+                         buy=np.nan, sell=np.nan)
+    fills = pd.DataFrame(fills)
+    if not fills.empty:
+        for side in ("BUY", "SELL"):
+            pts = fills[fills["side"] == side]
+            frame.loc[pd.DatetimeIndex(pts["time"]), side.lower()] = pts["price"].to_numpy()
+    return downsample_ohlcv(frame, max_points)
+
+
+def save_signal_plot(df, sma, fills, out_png: str, max_points: int = MAX_PLOT_POINTS):
+    """Plot close, SMA and fill markers for backtests run without Cerebro."""
+    from matplotlib.figure import Figure
+
+    frame = _plot_frame(df, fills, sma, max_points)
+    # Figure() without pyplot: no global state, safe to call from threads
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.plot(frame.index, frame["close"], label="close", linewidth=1.0)
+    if sma is not None:
+        ax.plot(frame.index, frame["sma"], label="sma", linewidth=1.0)
+    for side, marker, color in (("buy", "^", "green"), ("sell", "v", "red")):
+        pts = frame[side].dropna()
+        if not pts.empty:
+            ax.scatter(pts.index, pts, marker=marker, color=color, label=side, zorder=3)
+    ax.legend(loc="best")
+    fig.savefig(out_png, dpi=300, bbox_inches="tight")
+
+
+def save_fast_plot(df, fills, out_png: str, sma=None, max_points: int = MAX_PLOT_POINTS):
+    """
+    Candlestick chart of the raw OHLCV frame with fill markers, via mplfinance.
+
+    Much cheaper than cerebro.plot(), which re-walks every line and observer.
+    `fills` is any records/DataFrame with time, side and price columns.
+    """
+    import matplotlib.pyplot as plt
+    try:
+        import mplfinance as mpf
+    except ImportError as exc:
+        raise ImportError("save_fast_plot requires mplfinance (pip install mplfinance)") from exc
+
+    frame = _plot_frame(df, fills, sma, max_points)
+    addplot = []
+    if sma is not None:
+        addplot.append(mpf.make_addplot(frame["sma"], width=1.0))
+    for side, marker, color in (("buy", "^", "green"), ("sell", "v", "red")):
+        if frame[side].notna().any():
+            addplot.append(mpf.make_addplot(frame[side], type="scatter", marker=marker,
+                                            color=color, markersize=60))
+
+    with _PYPLOT_LOCK:
+        fig, _ = mpf.plot(
+            frame,
+            type="candle",
+            volume="volume" in frame.columns,
+            addplot=addplot,
+            columns=("open", "high", "low", "close", "volume"),
+            returnfig=True,
+            figsize=(12, 7),
+            warn_too_much_data=len(frame) + 1,  # already capped at max_points
+        )
+        plt.close(fig)  # detach from pyplot; the Figure itself stays usable
+    fig.savefig(out_png, dpi=150, bbox_inches="tight")
+
+
+def save_sweep_heatmap(results: pd.DataFrame, x: str, y: str, out_png: str,
+                       value: str = "return_pct"):
+    """Heatmap of `value` over two swept parameters (mean over any others)."""
+    import matplotlib.pyplot as plt
+
+    grid = results.pivot_table(index=y, columns=x, values=value, aggfunc="mean")
+    fig, ax = plt.subplots(figsize=(max(6, 0.6 * len(grid.columns) + 2),
+                                    max(4, 0.5 * len(grid.index) + 2)))
+    im = ax.imshow(grid.to_numpy(), origin="lower", aspect="auto", cmap="RdYlGn")
+    ax.set_xticks(range(len(grid.columns)), [f"{c:g}" for c in grid.columns])
+    ax.set_yticks(range(len(grid.index)), [f"{r:g}" for r in grid.index])
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    fig.colorbar(im, ax=ax, label=value)
+    fig.savefig(out_png, dpi=150, bbox_inches="tight")
+    plt.close(fig)
@@ -0,0 +1,218 @@
+//! Native kernels for the price/SMA cross rule.
+//!
+//! Same trades as `quantlab.strategies._ma_cross_loop`: fills at the signal
+//! bar's close, one share per trade, ties keep the previous side (like
+//! `bt.ind.CrossOver`), and bars within `TIE_RTOL` of the running SMA are
+//! decided on the exactly rounded window sum Backtrader's SMA uses
+//! (`math.fsum`). Trades come back as a (k, 6) float64 array with the
+//! columns of `ma_cross_vec.TRADE_COLUMNS`.
+
+use numpy::{PyArray1, PyArray2, PyArrayMethods, PyReadonlyArray1};
+use pyo3::prelude::*;
+use rayon::prelude::*;
+
+const TRADE_FIELDS: usize = 6;
+/// Same value as `quantlab.core.indicators.TIE_RTOL`.
+const TIE_RTOL: f64 = 1e-6;
+
+struct Trade {
+    entry_i: usize,
+    exit_i: usize,
+    entry_px: f64,
+    exit_px: f64,
+    gross: f64,
+    net: f64,
+}
+
+/// Running-sum SMA, NaN until a full window is available.
+fn rolling_mean(close: &[f64], period: usize, out: &mut Vec<f64>) {
+    out.clear();
+    out.resize(close.len(), f64::NAN);
+    if period == 0 {
+        return;
+    }
+    let mut total = 0.0;
+    for (i, &px) in close.iter().enumerate() {
+        if i < period {
+            total += px;
+        } else {
+            total += px - close[i - period];
+        }
+        if i + 1 >= period {
+            out[i] = total / period as f64;
+        }
+    }
+}
+
+/// `math.fsum(x)`: CPython's exactly rounded sum (Shewchuk partials plus its
+/// half-way rounding fix), using `partials` as scratch space.
+fn window_fsum(x: &[f64], partials: &mut Vec<f64>) -> f64 {
+    partials.clear();
+    for &px in x {
+        let mut v = px;
+        let mut i = 0;
+        for j in 0..partials.len() {
+            let mut y = partials[j];
+            if v.abs() < y.abs() {
+                std::mem::swap(&mut v, &mut y);
+            }
+            let hi = v + y;
+            let lo = y - (hi - v);
+            if lo != 0.0 {
+                partials[i] = lo;
+                i += 1;
+            }
+            v = hi;
+        }
+        partials.truncate(i);
+        if v != 0.0 {
+            partials.push(v);
+        }
+    }
+    let mut n = partials.len();
+    if n == 0 {
+        return 0.0;
+    }
+    n -= 1;
+    let mut hi = partials[n];
+    let mut lo = 0.0;
+    while n > 0 {
+        let v = hi;
+        n -= 1;
+        let y = partials[n];
+        hi = v + y;
+        lo = y - (hi - v);
+        if lo != 0.0 {
+            break;
+        }
+    }
+    if n > 0 && ((lo < 0.0 && partials[n - 1] < 0.0) || (lo > 0.0 && partials[n - 1] > 0.0)) {
+        let y = lo * 2.0;
+        let v = hi + y;
+        if y == v - hi {
+            hi = v;
+        }
+    }
+    hi
+}
+
+/// Single pass over the bars; `trades` is cleared and refilled so grid
+/// iterations reuse its allocation.
+fn scan(
+    close: &[f64],
+    sma: &[f64],
+    period: usize,
+    commission: f64,
+    partials: &mut Vec<f64>,
+    trades: &mut Vec<Trade>,
+) {
+    trades.clear();
+    let mut side = 0i8; // sign of the last non-zero close - sma
+    let mut in_pos = false;
+    let mut entry_px = 0.0;
+    let mut entry_i = 0usize;
+    for (i, (&px, &ma)) in close.iter().zip(sma).enumerate() {
+        let mut diff = px - ma;
+        if diff.abs() <= TIE_RTOL * ma.abs() {
+            diff = px - window_fsum(&close[i + 1 - period..=i], partials) / period as f64;
+        }
+        let s = if diff > 0.0 {
+            1
+        } else if diff < 0.0 {
+            -1
+        } else {
+            continue; // tie or NaN warm-up
+        };
+        let crossed = side != 0 && s != side;
+        side = s;
+        if !crossed {
+            continue;
+        }
+        if !in_pos && s > 0 {
+            in_pos = true;
+            entry_px = px;
+            entry_i = i;
+        } else if in_pos && s < 0 {
+            let gross = px - entry_px;
+            trades.push(Trade {
+                entry_i,
+                exit_i: i,
+                entry_px,
+                exit_px: px,
+                gross,
+                net: gross - commission * (entry_px + px),
+            });
+            in_pos = false;
+        }
+    }
+}
+
+/// Closed trades of the cross rule on `prices` as a (k, 6) array.
+#[pyfunction]
+fn run_ma_cross<'py>(
+    py: Python<'py>,
+    prices: PyReadonlyArray1<'py, f64>,
+    period: usize,
+    commission: f64,
+) -> PyResult<Bound<'py, PyArray2<f64>>> {
+    let close = prices.as_slice()?; // zero-copy view of the NumPy buffer
+    let trades = py.allow_threads(|| {
+        let mut sma = Vec::with_capacity(close.len());
+        let mut partials = Vec::with_capacity(period);
+        let mut trades = Vec::with_capacity(close.len() / 2 + 1);
+        rolling_mean(close, period, &mut sma);
+        scan(close, &sma, period, commission, &mut partials, &mut trades);
+        trades
+    });
+
+    let mut flat = Vec::with_capacity(trades.len() * TRADE_FIELDS);
+    for t in &trades {
+        flat.extend_from_slice(&[
+            t.entry_i as f64,
+            t.exit_i as f64,
+            t.entry_px,
+            t.exit_px,
+            t.gross,
+            t.net,
+        ]);
+    }
+    PyArray1::from_vec_bound(py, flat).reshape([trades.len(), TRADE_FIELDS])
+}
+
+/// Total net PnL per share for each SMA period, spread over Rayon's pool.
+#[pyfunction]
+fn run_grid(
+    py: Python<'_>,
+    prices: PyReadonlyArray1<'_, f64>,
+    periods: Vec<usize>,
+    commission: f64,
+) -> PyResult<Vec<f64>> {
+    let close = prices.as_slice()?;
+    Ok(py.allow_threads(|| {
+        periods
+            .par_iter()
+            .map_init(
+                // One SMA / fsum / trades buffer per worker thread, reused across periods
+                || {
+                    (
+                        Vec::with_capacity(close.len()),
+                        Vec::new(),
+                        Vec::with_capacity(close.len() / 2 + 1),
+                    )
+                },
+                |(sma, partials, trades), &period| {
+                    rolling_mean(close, period, sma);
+                    scan(close, sma, period, commission, partials, trades);
+                    trades.iter().map(|t| t.net).sum::<f64>()
+                },
+            )
+            .collect()
+    }))
+}
+
+#[pymodule]
+fn quantlab_rs(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_function(wrap_pyfunction!(run_ma_cross, m)?)?;
+    m.add_function(wrap_pyfunction!(run_grid, m)?)?;
+    Ok(())
+}
@@ -1,14 +1,22 @@
 # CLI to run backtests without touching core/library code
 import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
+
+# Headless; charts are only ever written to disk. Set via the environment so
+# matplotlib is not imported unless a chart is drawn (workers inherit it too).
+os.environ["MPLBACKEND"] = "Agg"
+
 import pandas as pd
 
 from quantlab.strategies import get_strategy_class
 from quantlab.core.data import download_ohlcv, bt_feed_from_df
-from quantlab.core.engine import run_backtest
-from quantlab.core.analyzers import DEFAULT_ANALYZERS
-from quantlab.utils.io import ensure_dir, save_cerebro_plot
+from quantlab.core.engine import run_backtest, run_fast_path, run_vectorized_ma_cross
+from quantlab.core.analyzers import DEFAULT_ANALYZERS, trade_stats
+from quantlab.utils.io import (ensure_dir, save_cerebro_plot, save_fast_plot,
+                               save_signal_plot, write_csv)
 
 
 def parse_args():
@@ -17,6 +25,8 @@ def parse_args():
     p.add_argument("--strategy", default="ma_cross",
                    help="Strategy name registered in quantlab.strategies")
     p.add_argument("--symbol", default="AAPL", help="Ticker symbol")
+    p.add_argument("--symbols", default=None,
+                   help="Comma-separated tickers to backtest in parallel (overrides --symbol)")
     p.add_argument("--start", default="2021-01-01", help="Backtest start date (YYYY-MM-DD)")
     p.add_argument("--end", default="2023-01-01", help="Backtest end date (YYYY-MM-DD)")
     p.add_argument("--cash", type=float, default=100_000, help="Initial cash")
@@ -28,18 +38,36 @@ def parse_args():
                    help="Export per-fill executions if strategy supports it")
     p.add_argument("--no-export-fills", dest="export_fills", action="store_false",
                    help="Disable per-fill export")
+    p.add_argument("--engine", choices=["vectorized", "fast", "backtrader"], default="vectorized",
+                   help="Backtest engine: vectorized (ma_cross only), fast (compiled bar "
+                        "loop for strategies with supports_fast_path) or backtrader")
+    p.add_argument("--no-cache", dest="use_cache", action="store_false",
+                   help="Bypass the local Parquet cache and re-download data")
+    p.add_argument("--fast-plot", action="store_true",
+                   help="Render an mplfinance candle chart instead of the default plot")
+    p.add_argument("--no-plot", action="store_true", help="Skip chart generation")
     p.add_argument("--outdir", default="results", help="Output directory")
-    return p.parse_args()
+    args = p.parse_args()
+    if args.symbols is not None:
+        args.symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+        if not args.symbols:
+            p.error("--symbols needs at least one ticker")
+    return args
 
 
-def main():
-    args = parse_args()
+def run_one(args, symbol: str, defer_plot: bool = False) -> dict:
+    """
+    Run a single-symbol backtest, write its outputs and return summary stats.
+
+    With defer_plot the chart is not drawn here; its inputs are returned under
+    "plot_job" for the caller to render (see run_many).
+    """
     outdir = Path(args.outdir)
     ensure_dir(str(outdir))
 
     # --- Load data ---
-    df = download_ohlcv(args.symbol, args.start, args.end)
-    feed = bt_feed_from_df(df)
+    df = download_ohlcv(symbol, args.start, args.end, use_cache=args.use_cache)
+    png_path = outdir / f"{args.strategy}_{symbol}.png"
 
     # --- Strategy class & kwargs ---
     strat_cls = get_strategy_class(args.strategy)
@@ -51,67 +79,128 @@ def main():
             "export_fills": args.export_fills,
         }
 
-    # --- Run backtest ---
-    cerebro, strat = run_backtest(
-        strategy_cls=strat_cls,
-        data_feed=feed,
-        initial_cash=args.cash,
-        commission=args.commission,
-        sizer_stake=args.stake,
-        analyzers=DEFAULT_ANALYZERS,
-        strategy_kwargs=strat_kwargs,
-    )
+    res = None
+    if args.strategy == "ma_cross" and args.engine == "vectorized":
+        # --- Run vectorized backtest (no Cerebro event loop) ---
+        res = run_vectorized_ma_cross(
+            df,
+            ma_period=args.ma_period,
+            stake=args.stake,
+            cash=args.cash,
+            commission=args.commission,
+        )
+    elif args.engine == "fast":
+        # --- Run compiled bar loop (strategy must support the fast path) ---
+        res = run_fast_path(
+            strat_cls,
+            df,
+            initial_cash=args.cash,
+            commission=args.commission,
+            sizer_stake=args.stake,
+            strategy_kwargs=strat_kwargs,
+        )
+
+    if res is not None:
+        plot_sma = res.get("sma")
+        trades = res["trades"]
+        fills = res["fills"]
+        final_value = res["final_value"]
+        stats = trade_stats(trades)
+        total_trades, wins, losses = stats["total_trades"], stats["wins"], stats["losses"]
+        # Sharpe/drawdown computed from the equity curve (daily bars assumed)
+        sharpe_a = res["metrics"]["sharpe"]
+        sharpe_label, sharpe_key = "Sharpe (per-bar x sqrt(252))", "sharpe_per_bar_ann"
+        max_drawdown = res["metrics"]["max_drawdown"]
+        max_dd_len = res["metrics"]["max_dd_len"]
+    else:
+        # cerebro.plot() draws the strategy's indicator lines and the standard
+        # observers, so that chart needs the plain Backtrader indicator path
+        cerebro_plot = not (args.no_plot or defer_plot or args.fast_plot)
+        if cerebro_plot:
+            feed = bt_feed_from_df(df)
+            if args.strategy == "ma_cross":
+                strat_kwargs["vectorized_sma"] = False
+        else:
+            # ma_cross reads its cross signal precomputed on the feed
+            ma_period = args.ma_period if args.strategy == "ma_cross" else None
+            feed = bt_feed_from_df(df, ma_period=ma_period)
+
+        # --- Run backtest ---
+        cerebro, strat = run_backtest(
+            strategy_cls=strat_cls,
+            data_feed=feed,
+            initial_cash=args.cash,
+            commission=args.commission,
+            sizer_stake=args.stake,
+            analyzers=DEFAULT_ANALYZERS,
+            strategy_kwargs=strat_kwargs,
+            minimal=False if cerebro_plot else None,
+        )
+
+        trades = getattr(strat, "trades", [])
+        fills = getattr(strat, "fills_log", [])
+        plot_sma = feed.p.dataname.get("sma")
+        final_value = cerebro.broker.getvalue()
+
+        ta = strat.analyzers.ta.get_analysis()
+        sharpe = strat.analyzers.sharpe.get_analysis()
+        dd = strat.analyzers.dd.get_analysis()
+
+        total_trades = ta.get("total", {}).get("closed", 0)
+        wins = ta.get("won", {}).get("total", 0)
+        losses = ta.get("lost", {}).get("total", 0)
+        sharpe_a = sharpe.get("sharperatio", None)
+        # Not comparable with the per-bar figure: SharpeRatio_A works on yearly returns
+        sharpe_label, sharpe_key = "Sharpe (SharpeRatio_A)", "sharpe_ratio_a"
+        max_drawdown = dd.get("max", {}).get("drawdown", None)
+        max_dd_len = dd.get("max", {}).get("len", None)
 
     # --- Save plot ---
-    png_path = outdir / f"{args.strategy}_{args.symbol}.png"
-    save_cerebro_plot(cerebro, str(png_path))
+    plot_job = None
+    if args.no_plot:
+        png_path = None
+    elif defer_plot:
+        plot_job = (df, fills, str(png_path), plot_sma)
+    elif args.fast_plot:
+        save_fast_plot(df, fills, str(png_path), sma=plot_sma)
+    elif res is not None:
+        save_signal_plot(df, plot_sma, fills, str(png_path))
+    else:
+        save_cerebro_plot(cerebro, str(png_path))
 
     # --- Export trades (per-trade summaries) ---
-    trades = getattr(strat, "trades", [])
     trades_csv_path = None
-    if trades:
+    if len(trades):
         trades_df = pd.DataFrame(trades)
 
         # Round numeric columns for readability if present
-        round_2 = ["size_peak", "avg_entry_cost", "gross_pnl", "net_pnl", "commission"]
+        round_2 = ["size_peak", "avg_entry_cost", "exit_price", "return_pct", "gross_pnl",
+                   "net_pnl", "commission"]
         for col in round_2:
             if col in trades_df.columns:
                 trades_df[col] = trades_df[col].astype(float).round(2)
 
-        trades_csv_path = outdir / f"{args.strategy}_{args.symbol}_trades.csv"
-        trades_df.to_csv(trades_csv_path, index=False)
+        trades_csv_path = outdir / f"{args.strategy}_{symbol}_trades.csv"
+        write_csv(trades_df, trades_csv_path)
 
     # --- Optional: export per-fill executions (scaling in/out details) ---
-    fills = getattr(strat, "fills_log", [])
     fills_csv_path = None
-    if args.export_fills and fills:
+    if args.export_fills and len(fills):
         fills_df = pd.DataFrame(fills)
         for col in ["size", "price", "commission"]:
             if col in fills_df.columns:
                 fills_df[col] = fills_df[col].astype(float).round(4)
-        fills_csv_path = outdir / f"{args.strategy}_{args.symbol}_fills.csv"
-        fills_df.to_csv(fills_csv_path, index=False)
+        fills_csv_path = outdir / f"{args.strategy}_{symbol}_fills.csv"
+        write_csv(fills_df, fills_csv_path)
 
     # --- Collect summary stats ---
-    final_value = cerebro.broker.getvalue()
     net_pl = final_value - args.cash
     ret_pct = (final_value / args.cash - 1.0) * 100.0
-
-    ta = strat.analyzers.ta.get_analysis()
-    sharpe = strat.analyzers.sharpe.get_analysis()
-    dd = strat.analyzers.dd.get_analysis()
-
-    total_trades = ta.get("total", {}).get("closed", 0)
-    wins = ta.get("won", {}).get("total", 0)
-    losses = ta.get("lost", {}).get("total", 0)
     win_rate = wins / total_trades * 100 if total_trades > 0 else None
-    sharpe_a = sharpe.get("sharperatio", None)
-    max_drawdown = dd.get("max", {}).get("drawdown", None)
-    max_dd_len = dd.get("max", {}).get("len", None)
 
     # --- Print summary to console ---
     print("\n=== Backtest Results ===")
-    print(f"Strategy: {args.strategy} | Symbol: {args.symbol}")
+    print(f"Strategy: {args.strategy} | Symbol: {symbol}")
     print(f"Period: {args.start} → {args.end}")
     print(f"Final Portfolio Value: ${final_value:,.2f}")
     print(f"Initial Capital:       ${args.cash:,.2f}")
@@ -121,21 +210,23 @@ def main():
     print(f"Wins: {wins} | Losses: {losses}")
     print(f"Win Rate:              {win_rate:.2f}%"
           if win_rate is not None else "Win Rate: N/A")
-    print(f"Sharpe (annualized):   {sharpe_a}")
+    print(f"{sharpe_label + ':':<22} {sharpe_a}")
     print(f"Max Drawdown (%):      {max_drawdown} | Length (bars): {max_dd_len}")
-    print(f"Plot saved to:         {png_path}")
+    # A deferred chart is reported by run_many once it has been drawn
+    if png_path and not defer_plot:
+        print(f"Plot saved to:         {png_path}")
     if trades_csv_path:
         print(f"Trades CSV:            {trades_csv_path}")
     if fills_csv_path:
         print(f"Fills  CSV:            {fills_csv_path}")
 
     # --- Save summary to file ---
-    summary_file = outdir / f"{args.strategy}_{args.symbol}_summary.txt"
+    summary_file = outdir / f"{args.strategy}_{symbol}_summary.txt"
     with open(summary_file, "w", encoding="utf-8") as f:
         f.write("=== Backtest Results Summary ===\n")
         f.write(f"Generated at: {datetime.now():%Y-%m-%d %H:%M:%S}\n")
         f.write(f"Strategy: {args.strategy}\n")
-        f.write(f"Symbol: {args.symbol}\n")
+        f.write(f"Symbol: {symbol}\n")
         f.write(f"Period: {args.start} to {args.end}\n")
         f.write("\n--- Portfolio ---\n")
         f.write(f"Initial Cash: ${args.cash:,.2f}\n")
@@ -148,11 +239,12 @@ def main():
         f.write(f"Losses: {losses}\n")
         f.write(f"Win Rate: {win_rate:.2f}%\n" if win_rate is not None else "Win Rate: N/A\n")
         f.write("\n--- Risk Metrics ---\n")
-        f.write(f"Sharpe (annualized): {sharpe_a}\n")
+        f.write(f"{sharpe_label}: {sharpe_a}\n")
         f.write(f"Max Drawdown (%): {max_drawdown}\n")
         f.write(f"Max Drawdown Length (bars): {max_dd_len}\n")
         f.write("\n--- Files ---\n")
-        f.write(f"- Plot:       {png_path}\n")
+        if png_path and not defer_plot:
+            f.write(f"- Plot:       {png_path}\n")
         if trades_csv_path:
             f.write(f"- Trades CSV: {trades_csv_path}\n")
         if fills_csv_path:
@@ -160,6 +252,87 @@ def main():
 
     print(f"\nSummary saved to {summary_file}")
 
+    return {
+        "symbol": symbol,
+        "final_value": final_value,
+        "net_pl": net_pl,
+        "return_pct": ret_pct,
+        "total_trades": total_trades,
+        "wins": wins,
+        "losses": losses,
+        "win_rate": win_rate,
+        sharpe_key: sharpe_a,
+        "max_drawdown": max_drawdown,
+        "max_dd_len": max_dd_len,
+        "plot_job": plot_job,
+        "summary_file": str(summary_file),
+    }
+
+
+def run_many(args, symbols):
+    """
+    Backtest each symbol in its own process and write a combined summary.
+
+    Charts are kept off the critical path: as each backtest returns, its chart
+    is handed to a small thread pool (Agg releases the GIL while rasterizing
+    and encoding). Cerebro objects cannot leave the worker, so charts here are
+    always drawn from the DataFrame (candles with --fast-plot).
+    """
+    rows = []
+    plot = save_fast_plot if args.fast_plot else _save_signal_plot_job
+    with ProcessPoolExecutor(max_workers=min(len(symbols), os.cpu_count() or 1)) as pool, \
+            ThreadPoolExecutor(max_workers=4) as plotters:
+        futures = {pool.submit(run_one, args, sym, defer_plot=True): sym for sym in symbols}
+        plot_futures = {}
+        for i, fut in enumerate(as_completed(futures), 1):
+            sym = futures[fut]
+            try:
+                row = fut.result()
+            except Exception as exc:
+                print(f"[{i}/{len(symbols)}] {sym} failed: {exc}")
+                continue
+            job = row.pop("plot_job")
+            summary_file = row.pop("summary_file")
+            if job is not None:
+                df, fills, png, sma = job
+                fut = plotters.submit(plot, df, fills, png, sma=sma)
+                plot_futures[fut] = (sym, png, summary_file)
+            rows.append(row)
+            print(f"[{i}/{len(symbols)}] {sym} done")
+
+        for fut in as_completed(plot_futures):
+            sym, png, summary_file = plot_futures[fut]
+            try:
+                fut.result()
+            except Exception as exc:
+                print(f"Plot for {sym} failed: {exc}")
+                continue
+            # The summary's "Files" section is last, so the chart can be appended
+            with open(summary_file, "a", encoding="utf-8") as f:
+                f.write(f"- Plot:       {png}\n")
+            print(f"Plot for {sym} saved to {png}")
+
+    if not rows:
+        return
+    summary_df = pd.DataFrame(rows).sort_values("symbol")
+    summary_csv = Path(args.outdir) / "portfolio_summary.csv"
+    write_csv(summary_df, summary_csv)
+    print("\n=== Portfolio Summary ===")
+    print(summary_df.to_string(index=False))
+    print(f"\nPortfolio summary saved to {summary_csv}")
+
+
+def _save_signal_plot_job(df, fills, out_png, sma=None):
+    save_signal_plot(df, sma, fills, out_png)
+
+
+def main():
+    args = parse_args()
+    if args.symbols:
+        run_many(args, args.symbols)
+    else:
+        run_one(args, args.symbol)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+# CLI to sweep ma_cross parameters over a process pool
+import argparse
+from pathlib import Path
+
+from quantlab.core.engine import run_sweep
+from quantlab.utils.io import ensure_dir, save_sweep_heatmap, write_csv
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def parse_args():
+    """Parse command-line arguments."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--symbol", default="AAPL", help="Ticker symbol")
+    p.add_argument("--start", default="2021-01-01", help="Backtest start date (YYYY-MM-DD)")
+    p.add_argument("--end", default="2023-01-01", help="Backtest end date (YYYY-MM-DD)")
+    p.add_argument("--cash", type=float, default=100_000, help="Initial cash")
+    p.add_argument("--ma-periods", type=_ints, default=_ints("5,10,20,30,50,100,200"),
+                   help="Comma-separated SMA periods")
+    p.add_argument("--commissions", type=_floats, default=_floats("0,0.0005,0.001,0.002"),
+                   help="Comma-separated commission fractions")
+    p.add_argument("--stakes", type=_ints, default=_ints("100"),
+                   help="Comma-separated share counts per trade")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: cpu count)")
+    p.add_argument("--outdir", default="results", help="Output directory")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    outdir = Path(args.outdir)
+    ensure_dir(str(outdir))
+
+    grid = {
+        "ma_period": args.ma_periods,
+        "commission": args.commissions,
+        "stake": args.stakes,
+    }
+    results = run_sweep(args.symbol, args.start, args.end, grid,
+                        cash=args.cash, max_workers=args.workers)
+
+    csv_path = outdir / f"sweep_ma_cross_{args.symbol}.csv"
+    write_csv(results, csv_path)
+    png_path = outdir / f"sweep_ma_cross_{args.symbol}.png"
+    save_sweep_heatmap(results, "ma_period", "commission", str(png_path))
+
+    best = results.sort_values("return_pct", ascending=False).head(5)
+    print(f"\n=== Sweep: {len(results)} combinations ({args.symbol}) ===")
+    print(best.to_string(index=False))
+    print(f"\nResults CSV: {csv_path}")
+    print(f"Heatmap:     {png_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# Builds the optional Cython kernel: python setup.py build_ext --inplace
+from setuptools import Extension, find_namespace_packages, setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:  # pragma: no cover - optional build dependency
+    cythonize = None  # install without the kernel; run() falls back to Numba
+
+extensions = [
+    Extension(
+        "quantlab.strategies._ma_cross_cy",
+        ["quantlab/strategies/_ma_cross_cy.pyx"],
+        # No -ffast-math: the kernel relies on NaN / tie comparisons behaving
+        # exactly; no -march=native so the build runs on any x86-64 host.
+        extra_compile_args=["-O3"],
+    )
+]
+
+setup(
+    name="quantlab",
+    packages=find_namespace_packages(include=["quantlab*"]),
+    ext_modules=cythonize(extensions) if cythonize is not None else [],
+)
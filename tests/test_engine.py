@@ -0,0 +1,248 @@
+
+# Parity tests between the Backtrader path and the vectorized engine
+import numpy as np
+import pandas as pd
+from quantlab.strategies import get_strategy_class
+from quantlab.core.analyzers import DEFAULT_ANALYZERS, trade_stats
+from quantlab.core.data import bt_feed_from_df
+from quantlab.core.engine import run_backtest, run_fast_path, run_vectorized_ma_cross
+
+
+def random_walk_df(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, n)), 2)
+    open_ = np.round(close + rng.normal(0, 0.5, n), 2)
+    idx = pd.date_range("2020-01-01", periods=n, freq="D")
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + 1,
+        "low": np.minimum(open_, close) - 1,
+        "close": close,
+        "volume": 1000.0,
+    }, index=idx)
+
+
+def test_precomputed_signals_follow_filtered_and_resampled_bars():
+    import datetime as dt
+    import backtrader as bt
+
+    df = random_walk_df(n=800)
+
+    def trades(resample, preload, **kwargs):
+        cerebro = bt.Cerebro(stdstats=False, preload=preload)
+        feed = bt_feed_from_df(df)
+        if resample:
+            cerebro.resampledata(feed, timeframe=bt.TimeFrame.Weeks)
+        else:
+            feed.p.fromdate = dt.datetime(2020, 6, 1)
+            cerebro.adddata(feed)
+        cerebro.addstrategy(get_strategy_class("ma_cross"), ma_period=10, **kwargs)
+        cerebro.broker.setcash(1_000_000)
+        return cerebro.run()[0].trades[["entry_time", "exit_time"]]
+
+    # The frame-wide close must not be used once the bars differ from its rows
+    for resample in (False, True):
+        for preload in (True, False):
+            ref = trades(resample, preload, vectorized_sma=False)
+            assert len(ref) > 0
+            assert trades(resample, preload).equals(ref)
+
+
+def test_minimal_run_keeps_trades():
+    strat_cls = get_strategy_class("ma_cross")
+    df = random_walk_df()
+    _, lean = run_backtest(strat_cls, bt_feed_from_df(df))
+    _, full = run_backtest(strat_cls, bt_feed_from_df(df), minimal=False)
+    assert not lean.observers and full.observers
+    assert len(lean.trades) > 0
+    assert lean.trades.equals(full.trades)
+
+
+def test_engines_agree_on_float32_prices():
+    from quantlab.core.data import _compact_columns
+    from quantlab.strategies.ma_cross_vec import run_ma_cross
+
+    strat_cls = get_strategy_class("ma_cross")
+    for seed in range(3):
+        # Stored the way download_ohlcv stores it: float32 price columns
+        df = _compact_columns(random_walk_df(n=5000, seed=seed))
+        assert df["close"].dtype == np.float32
+        _, strat = run_backtest(strat_cls, bt_feed_from_df(df),
+                                strategy_kwargs={"ma_period": 20, "vectorized_sma": False})
+        res = run_vectorized_ma_cross(df, ma_period=20)
+        got = pd.DataFrame(res["trades"])
+        assert len(got) == len(strat.trades) > 0
+        assert (got["entry_time"] == strat.trades["entry_time"]).all()
+        assert (got["exit_time"] == strat.trades["exit_time"]).all()
+
+        ref = run_ma_cross(df["close"].to_numpy(), 20, commission=0.001)
+        assert np.array_equal(strat_cls.run(df, 20, commission=0.001)[:, :2], ref[:, :2])
+
+
+def test_vectorized_matches_backtrader():
+    df = random_walk_df()
+    cerebro, strat = run_backtest(get_strategy_class("ma_cross"), bt_feed_from_df(df),
+                                  analyzers=DEFAULT_ANALYZERS,
+                                  strategy_kwargs={"ma_period": 20})
+    res = run_vectorized_ma_cross(df, ma_period=20)
+
+    assert np.isclose(res["final_value"], cerebro.broker.getvalue())
+    expected = pd.DataFrame(strat.trades)
+    got = pd.DataFrame(res["trades"])
+    assert len(got) == len(expected) > 0
+    assert (got["entry_time"] == expected["entry_time"]).all()
+    assert (got["exit_time"] == expected["exit_time"]).all()
+    assert np.allclose(got["net_pnl"], expected["net_pnl"])
+    assert np.allclose(got["exit_price"], expected["exit_price"])
+    assert np.allclose(got["return_pct"], expected["return_pct"])
+    assert len(res["fills"]) == len(strat.fills_log)
+
+    dd = strat.analyzers.dd.get_analysis()
+    assert np.isclose(res["metrics"]["max_drawdown"], dd["max"]["drawdown"])
+    assert res["metrics"]["max_dd_len"] == dd["max"]["len"]
+
+    ta = strat.analyzers.ta.get_analysis()
+    stats = trade_stats(strat.trades)
+    assert stats["total_trades"] == ta["total"]["closed"]
+    assert stats["wins"] == ta["won"]["total"]
+    assert np.isclose(stats["total_profit"], ta["pnl"]["net"]["total"])
+
+
+def test_paths_match_stock_sma_crossover_strategy():
+    import backtrader as bt
+
+    class Stock(bt.Strategy):
+        params = (("ma_period", 20),)
+
+        def __init__(self):
+            sma = bt.ind.SimpleMovingAverage(self.data.close, period=self.p.ma_period)
+            self.cross = bt.ind.CrossOver(self.data.close, sma)
+            self.closed = []
+
+        def next(self):
+            if not self.position and self.cross[0] > 0:
+                self.buy()
+            elif self.position and self.cross[0] < 0:
+                self.sell()
+
+        def notify_trade(self, trade):
+            if trade.isclosed:
+                self.closed.append((bt.num2date(trade.dtopen), bt.num2date(trade.dtclose),
+                                    trade.pnlcomm))
+
+    strat_cls = get_strategy_class("ma_cross")
+    # seed 3 / period 10 has an exact close == SMA tie at bar 533, which is not a cross
+    for seed in range(5):
+        df = random_walk_df(n=800, seed=seed)
+        for period in (5, 10, 20):
+            kwargs = {"ma_period": period}
+            _, stock = run_backtest(Stock, bt_feed_from_df(df), strategy_kwargs=kwargs)
+            expected = pd.DataFrame(stock.closed, columns=["entry_time", "exit_time", "net_pnl"])
+            _, arrays = run_backtest(strat_cls, bt_feed_from_df(df), strategy_kwargs=kwargs)
+            _, lines = run_backtest(strat_cls, bt_feed_from_df(df),
+                                    strategy_kwargs={**kwargs, "vectorized_sma": False})
+            runs = [arrays.trades, lines.trades,
+                    pd.DataFrame(run_vectorized_ma_cross(df, ma_period=period)["trades"]),
+                    pd.DataFrame(run_fast_path(strat_cls, df, strategy_kwargs=kwargs)["trades"])]
+            for got in runs:
+                assert len(got) == len(expected) > 0
+                assert (got["entry_time"] == expected["entry_time"]).all()
+                assert (got["exit_time"] == expected["exit_time"]).all()
+                assert np.allclose(got["net_pnl"], expected["net_pnl"])
+
+
+def test_precomputed_signal_feed_matches_indicators():
+    df = random_walk_df(seed=1)
+    strat_cls = get_strategy_class("ma_cross")
+    _, plain = run_backtest(strat_cls, bt_feed_from_df(df), strategy_kwargs={"ma_period": 20})
+    _, fast = run_backtest(strat_cls, bt_feed_from_df(df, ma_period=20),
+                           strategy_kwargs={"ma_period": 20})
+    assert len(fast.trades) == len(plain.trades) > 0
+    assert np.allclose(fast.trades["net_pnl"], plain.trades["net_pnl"])
+
+
+def test_numpy_cross_matches_crossover_indicator():
+    import backtrader as bt
+
+    df = random_walk_df(seed=6)
+    strat_cls = get_strategy_class("ma_cross")
+    _, arrays = run_backtest(strat_cls, bt_feed_from_df(df), strategy_kwargs={"ma_period": 20})
+    _, lines = run_backtest(strat_cls, bt_feed_from_df(df),
+                            strategy_kwargs={"ma_period": 20, "vectorized_sma": False})
+    # Unpreloaded plain feeds (no _np_close) also fall back to bt.ind.CrossOver
+    cerebro = bt.Cerebro(preload=False)
+    cerebro.broker.setcash(100_000.0)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df, openinterest=None))
+    cerebro.addstrategy(strat_cls, ma_period=20)
+    cerebro.broker.setcommission(commission=0.001)
+    cerebro.addsizer(bt.sizers.FixedSize, stake=100)
+    live = cerebro.run()[0]
+    assert arrays._cross is not None and lines._cross is None and live._cross is None
+    assert len(arrays.trades) == len(lines.trades) == len(live.trades) > 0
+    assert np.allclose(arrays.trades["net_pnl"], lines.trades["net_pnl"])
+    assert np.allclose(arrays.trades["net_pnl"], live.trades["net_pnl"])
+
+
+def test_dual_mode_paths_agree():
+    df = random_walk_df(n=800, seed=7)
+    strat_cls = get_strategy_class("ma_cross")
+    kwargs = {"mode": "dual", "fast_period": 10, "slow_period": 30}
+    _, preloaded = run_backtest(strat_cls, bt_feed_from_df(df), strategy_kwargs=kwargs)
+    _, live = run_backtest(strat_cls, bt_feed_from_df(df),
+                           strategy_kwargs={**kwargs, "vectorized_sma": False})
+    fast = run_fast_path(strat_cls, df, strategy_kwargs=kwargs)
+    assert len(preloaded.trades) == len(live.trades) == len(fast["trades"]) > 0
+    assert np.allclose(preloaded.trades["net_pnl"], live.trades["net_pnl"])
+    assert np.allclose(preloaded.trades["net_pnl"], [t["net_pnl"] for t in fast["trades"]])
+
+
+def test_fast_path_matches_vectorized():
+    df = random_walk_df(seed=2)
+    res = run_fast_path(get_strategy_class("ma_cross"), df, strategy_kwargs={"ma_period": 20})
+    ref = run_vectorized_ma_cross(df, ma_period=20)
+    assert np.allclose(res["equity"], ref["equity"])
+    assert res["trades"] == ref["trades"]
+    assert res["fills"] == ref["fills"]
+
+
+def test_run_ma_cross_matches_vectorized():
+    from quantlab.strategies.ma_cross_vec import run_ma_cross
+
+    df = random_walk_df(seed=3)
+    trades = run_ma_cross(df["close"].to_numpy(), 20, open_=df["open"].to_numpy(),
+                          stake=100, commission=0.001)
+    ref = pd.DataFrame(run_vectorized_ma_cross(df, ma_period=20)["trades"])
+    assert len(trades) == len(ref) > 0
+    assert (df.index[trades[:, 1].astype(int)] == ref["exit_time"]).all()
+    assert np.allclose(trades[:, 5], ref["net_pnl"])
+
+
+def test_compiled_loop_matches_run_ma_cross():
+    from quantlab.strategies.ma_cross_vec import run_ma_cross
+
+    df = random_walk_df(seed=4)
+    got = get_strategy_class("ma_cross").run(df, 20, commission=0.001)
+    ref = run_ma_cross(df["close"].to_numpy(), 20, commission=0.001)
+    assert len(got) == len(ref) > 0
+    assert np.allclose(got, ref)
+
+
+def test_specialized_loop_matches_generic_loop():
+    from quantlab.strategies._ma_cross_loop import (_ma_cross_loop, _rolling_mean,
+                                                    specialized_loop)
+
+    close = random_walk_df(seed=6)["close"].to_numpy()
+    for period in (5, 20, 50):
+        ref = _ma_cross_loop(close, _rolling_mean(close, period), period, 0.001)
+        assert np.array_equal(specialized_loop(period)(close, 0.001), ref)
+    assert specialized_loop(20) is specialized_loop(20)
+
+
+def test_run_grid_matches_per_period_runs():
+    from quantlab.strategies._ma_cross_loop import run_grid
+
+    df = random_walk_df(seed=5)
+    periods = np.array([5, 10, 20, 50])
+    got = run_grid(df["close"].to_numpy(), periods, 0.001)
+    ref = [get_strategy_class("ma_cross").run(df, p, 0.001)[:, 5].sum() for p in periods]
+    assert np.allclose(got, ref)
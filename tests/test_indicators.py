@@ -0,0 +1,59 @@
+
+# Vectorized indicator helpers against their pandas equivalents
+import numpy as np
+import pandas as pd
+from quantlab.core.indicators import crossover, rolling_apply, sma, sma_cross
+
+
+def test_sma_matches_pandas_rolling():
+    x = np.random.default_rng(0).normal(size=200).cumsum()
+    expected = pd.Series(x).rolling(10).mean().to_numpy()
+    assert np.allclose(sma(x, 10), expected, equal_nan=True)
+
+
+def test_rolling_apply_matches_pandas_apply():
+    x = np.random.default_rng(1).normal(size=100)
+    expected = pd.Series(x).rolling(7).apply(np.std, raw=True).to_numpy()
+    assert np.allclose(rolling_apply(x, 7, np.std), expected, equal_nan=True)
+    assert np.isnan(rolling_apply(x[:3], 7, np.std)).all()
+
+
+def test_crossover_ignores_touches():
+    close = np.array([1.0, 1.0, 2.0, 2.0, 3.0, 1.0])
+    line = np.array([np.nan, 2.0, 2.0, 2.0, 2.0, 2.0])
+    # touch at bars 2-3 is not a cross; the up-cross registers at bar 4
+    assert np.array_equal(crossover(close, line)[2:], [0.0, 0.0, 1.0, -1.0])
+
+
+def test_sma_cross_keeps_exact_ties():
+    close = np.array([2.3, 1.5, 1.1, 1.0, 2.6, 1.8])
+    # fsum(1.0, 2.6, 1.8) / 3 == 1.8 exactly, the running sum lands an ulp above
+    assert sma(close, 3)[-1] != close[-1]
+    cross, line = sma_cross(close, 3)
+    assert line[-1] == close[-1]
+    assert cross[-1] == 0.0
+
+
+def test_incremental_sma_matches_backtrader_sma():
+    import backtrader as bt
+    from quantlab.core.data import bt_feed_from_df
+    from quantlab.core.indicators import IncrementalSMA
+
+    class Both(bt.Strategy):
+        def __init__(self):
+            self.ref = bt.ind.SimpleMovingAverage(self.data.close, period=5)
+            self.inc = IncrementalSMA(self.data.close, period=5)
+            self.ref_cross = bt.ind.CrossOver(self.data.close, self.ref)
+            self.inc_cross = bt.ind.CrossOver(self.data.close, self.inc)
+
+    # prices on a 0.1 grid: the close ties the stock SMA(5) exactly on 8 bars
+    x = np.round(100 + np.random.default_rng(1).normal(size=300).cumsum(), 1)
+    idx = pd.date_range("2021-01-01", periods=300, freq="D")
+    df = pd.DataFrame({"open": x, "high": x, "low": x, "close": x, "volume": 1.0}, index=idx)
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(stdstats=False, runonce=runonce)
+        cerebro.adddata(bt_feed_from_df(df))
+        cerebro.addstrategy(Both)
+        strat = cerebro.run()[0]
+        assert np.array_equal(strat.inc.array, strat.ref.array, equal_nan=True)
+        assert np.array_equal(strat.inc_cross.array, strat.ref_cross.array, equal_nan=True)
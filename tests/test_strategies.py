@@ -1,5 +1,6 @@
 
 # Minimal tests to ensure strategies load and run a few bars
+import numpy as np
 import pandas as pd
 from quantlab.strategies import get_strategy_class
 from quantlab.core.data import bt_feed_from_df
@@ -8,12 +9,13 @@ from quantlab.core.engine import run_backtest
 
 def tiny_df():
     idx = pd.date_range("2021-01-01", periods=50, freq="D")
+    x = np.arange(50, dtype=np.float64)
     df = pd.DataFrame({
-        "open": range(50),
-        "high": [x+1 for x in range(50)],
-        "low":  [x-1 for x in range(50)],
-        "close": range(50),
-        "volume": [1000]*50,
+        "open": x,
+        "high": x + 1,
+        "low":  x - 1,
+        "close": x,
+        "volume": np.full(50, 1000.0),
     }, index=idx)
     return df
 
@@ -23,3 +25,13 @@ def test_ma_cross_runs():
     feed = bt_feed_from_df(tiny_df())
     cerebro, strat = run_backtest(strat_cls, feed, sizer_stake=1)
     assert hasattr(strat, "trades")
+
+
+def test_num2datetime64_matches_num2date():
+    import backtrader as bt
+    from quantlab.strategies.ma_cross import _num2datetime64
+
+    ts = pd.date_range("2021-01-01", periods=500, freq="17min7s")
+    nums = np.array([bt.date2num(t.to_pydatetime()) for t in ts])
+    expected = pd.DatetimeIndex([bt.num2date(x) for x in nums])
+    assert (pd.DatetimeIndex(_num2datetime64(nums)) == expected).all()